@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+# Headless load test: runs QuizSessions against a local stub of random-word-api and MyMemory and reports
+# init / first-question / per-question latencies, API requests per session and throughput.
+#
+#   python benchmark.py --sessions 8 --concurrency 4
+#   python benchmark.py --save-baseline            # write benchmark_baseline.json
+#   python benchmark.py --compare                  # exit 1 if slower than the baseline
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+REGRESSION_TOLERANCE = 0.25 # 25% worse than the baseline counts as a regression
+
+# --- Stub API Server ---
+_stub_rng = random.Random(0)
+STUB_WORDS = sorted({"".join(_stub_rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_stub_rng.randint(3, 9))) for _ in range(5000)})
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, like the real endpoints
+    server_version = "ViblingoStub/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        stub.count(url.path)
+        time.sleep(max(0.0, random.gauss(stub.latency_ms, stub.jitter_ms)) / 1000.0)
+        if url.path == "/get" and random.random() < stub.slow_rate: # MyMemory's occasional stalls
+            time.sleep(stub.slow_ms / 1000.0)
+
+        if random.random() < stub.error_rate:
+            self._send(500, {"error": "stub error"})
+        elif url.path == "/api":
+            if random.random() < stub.rate_limit_rate:
+                self._send(429, {"error": "Too Many Requests"})
+                return
+            count = int(params.get("words", ["1"])[0])
+            self._send(200, random.sample(STUB_WORDS, min(count, len(STUB_WORDS))))
+        elif url.path == "/get":
+            if random.random() < stub.rate_limit_rate: # MyMemory reports quota errors inside a 200 response
+                self._send(200, {"responseStatus": 429, "responseData": {"translatedText": "MYMEMORY WARNING: YOU USED ALL AVAILABLE FREE TRANSLATIONS"}})
+                return
+            source_lang, target_lang = params["langpair"][0].split("|")
+            lines = params["q"][0].split("\n")
+            translated = "\n".join(f"{line}-{target_lang}" for line in lines)
+            self._send(200, {"responseStatus": 200, "responseData": {"translatedText": translated}})
+        elif url.path.startswith("/lingva/"): # /lingva/<source>/<target>/<text>
+            source_lang, target_lang, text = url.path[len("/lingva/"):].split("/", 2)
+            self._send(200, {"translation": f"{unquote(text)}-{target_lang}"})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class StubApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency_ms=40, jitter_ms=10, error_rate=0.0, rate_limit_rate=0.0, port=0, slow_rate=0.0, slow_ms=0):
+        super().__init__(("127.0.0.1", port), StubApiHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._lock = threading.Lock()
+        self.requests = {}
+
+    def count(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="stub-api", daemon=True).start()
+        return self
+
+# --- Session Driver ---
+def run_one_session(main, think_seconds, timeout, questions_per_lang):
+    timings = {"init": None, "init_all": None, "first_question": None, "questions": [], "error": None}
+    session = main.QuizSession(questions_per_lang=questions_per_lang)
+    started_at = time.monotonic()
+    # init: until the first phase can start (its pipeline is ready); init_all: until every language has its words
+    session.pipelines[session.languages[0]].ready.add_done_callback(lambda f: timings.update(init=time.monotonic() - started_at))
+
+    def initialize(): # in the background, like the GUI: the first phase starts as soon as its words are in
+        try:
+            session.initialize()
+            timings["init_all"] = time.monotonic() - started_at
+        except Exception:
+            pass # next_question() raises it through the phase's pipeline
+
+    init_thread = threading.Thread(target=initialize, name="bench-init", daemon=True)
+    init_thread.start()
+    try:
+        while True:
+            asked_at = time.monotonic()
+            record = session.next_question(timeout)
+            if record is None: break
+            timings["questions"].append(time.monotonic() - asked_at)
+            if timings["first_question"] is None:
+                timings["first_question"] = time.monotonic() - started_at
+            time.sleep(think_seconds)
+            session.check_answer(random.choice(main.build_answer_options(record)))
+    except Exception as e:
+        timings["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        init_thread.join()
+        session.close()
+    return timings
+
+def summarize(name, values, percentile):
+    values = [v for v in values if v is not None]
+    return {
+        f"{name}_p50_ms": round(1000 * percentile(values, 50), 1),
+        f"{name}_p95_ms": round(1000 * percentile(values, 95), 1),
+        f"{name}_p99_ms": round(1000 * percentile(values, 99), 1),
+    }
+
+def run_benchmark(args):
+    stub = StubApiServer(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate,
+                         slow_rate=args.slow_rate, slow_ms=args.slow_ms).start()
+    cache_dir = tempfile.mkdtemp(prefix="viblingo-bench-")
+    os.environ["VIBLINGO_RANDOM_WORD_API_URL"] = f"{stub.base_url}/api"
+    os.environ["VIBLINGO_MYMEMORY_API_URL"] = f"{stub.base_url}/get"
+    os.environ["VIBLINGO_CACHE_PATH"] = os.path.join(cache_dir, "cache.sqlite3") # cold cache every run
+    os.environ["VIBLINGO_TRACE_PATH"] = os.path.join(cache_dir, "trace.jsonl") # keep the checkout clean
+    os.environ["VIBLINGO_REVIEW_PATH"] = os.path.join(cache_dir, "reviews.jsonl") # not the learner's progress
+    os.environ["VIBLINGO_SOURCE"] = args.source
+    if args.lingva: os.environ["VIBLINGO_LINGVA_API_URL"] = f"{stub.base_url}/lingva" # a second provider to hedge with
+    import main # reads the variables above at import time
+
+    if args.quota_scale != 1.0:
+        main.api_scheduler = main.RateLimitedScheduler({name: {"rate": q["rate"] * args.quota_scale, "burst": max(1, int(q["burst"] * args.quota_scale))}
+                                                        for name, q in main.PROVIDER_QUOTAS.items()})
+
+    print(f"Stub API on {stub.base_url} (latency {args.latency_ms}±{args.jitter_ms} ms, errors {args.error_rate:.0%}, 429s {args.rate_limit_rate:.0%})")
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        sessions = list(executor.map(lambda _: run_one_session(main, args.think_ms / 1000.0, args.timeout, args.questions), range(args.sessions)))
+    elapsed = time.monotonic() - started_at
+
+    questions = [q for s in sessions for q in s["questions"]]
+    total_requests = sum(stub.requests.values())
+    report = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "failed_sessions": sum(1 for s in sessions if s["error"]),
+        "questions_shown": len(questions),
+        "elapsed_s": round(elapsed, 2),
+        "sessions_per_min": round(60 * args.sessions / elapsed, 2),
+        "questions_per_s": round(len(questions) / elapsed, 3),
+        "requests_total": total_requests,
+        "requests_per_session": round(total_requests / args.sessions, 2),
+        "requests_by_endpoint": dict(stub.requests),
+        "api_retries": main.api_scheduler.retries,
+        "hedged_requests": main.translation_router.hedges,
+        "cache_hits": main.translation_cache.hits,
+        "cache_misses": main.translation_cache.misses,
+    }
+    report.update(summarize("init", [s["init"] for s in sessions], main.percentile))
+    report.update(summarize("init_all", [s["init_all"] for s in sessions], main.percentile))
+    report.update(summarize("first_question", [s["first_question"] for s in sessions], main.percentile))
+    report.update(summarize("question", questions, main.percentile))
+    report["stage_latencies_ms"] = main.metrics_registry.summary()
+    report["providers"] = main.translation_router.metrics()
+    for s in sessions:
+        if s["error"]: print(f"Session failed: {s['error']}")
+
+    main.shutdown_background_services()
+    stub.shutdown()
+    return report
+
+# --- Baseline Comparison ---
+LOWER_IS_BETTER = ["init_p95_ms", "first_question_p95_ms", "question_p50_ms", "question_p95_ms", "requests_per_session"]
+HIGHER_IS_BETTER = ["questions_per_s"]
+NOT_SETTINGS = ("save_baseline", "compare", "tolerance") # flags that do not change what a run measures
+
+def run_settings(args):
+    return {k: v for k, v in vars(args).items() if k not in NOT_SETTINGS}
+
+# Flags whose values differ from the baseline's run; numbers from different settings are not comparable.
+def settings_mismatch(settings, baseline):
+    saved = {k: v for k, v in baseline.get("settings", {}).items() if k not in NOT_SETTINGS}
+    return [f"{key}: {saved.get(key)} -> {settings.get(key)}" for key in sorted(set(settings) | set(saved))
+            if saved.get(key) != settings.get(key)]
+
+def find_regressions(report, baseline, tolerance):
+    regressions = []
+    for key in LOWER_IS_BETTER:
+        if key in baseline and report[key] > baseline[key] * (1 + tolerance) and report[key] - baseline[key] > 1:
+            regressions.append(f"{key}: {baseline[key]} -> {report[key]}")
+    for key in HIGHER_IS_BETTER:
+        if key in baseline and report[key] < baseline[key] * (1 - tolerance):
+            regressions.append(f"{key}: {baseline[key]} -> {report[key]}")
+    if report["failed_sessions"] > baseline.get("failed_sessions", 0):
+        regressions.append(f"failed_sessions: {baseline.get('failed_sessions', 0)} -> {report['failed_sessions']}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Viblingo load test against a local API stub")
+    parser.add_argument("--sessions", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=5, help="questions per language in each session (long sessions stream their words)")
+    parser.add_argument("--think-ms", type=int, default=300, help="time a simulated learner looks at each question")
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with a 429")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of MyMemory requests that stall for --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=3000)
+    parser.add_argument("--lingva", action="store_true", help="also serve a Lingva endpoint, so translations can be hedged")
+    parser.add_argument("--quota-scale", type=float, default=1.0, help="multiply the client-side PROVIDER_QUOTAS")
+    parser.add_argument("--source", default="online", choices=["online", "offline", "fallback"])
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for one question before failing the session")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE_PATH, metavar="PATH")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_PATH, metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.compare: # checked before the run, not after it
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        mismatch = settings_mismatch(run_settings(args), baseline)
+        if mismatch:
+            for line in mismatch: print(f"SETTINGS {line}")
+            print(f"Not comparing: {args.compare} was recorded with other settings, rerun with them or save a new baseline")
+            sys.exit(2)
+
+    report = run_benchmark(args)
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(report, settings=run_settings(args)), f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.compare:
+        regressions = find_regressions(report, baseline, args.tolerance)
+        for line in regressions: print(f"REGRESSION {line}")
+        if regressions: sys.exit(1)
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
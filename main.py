@@ -1,12 +1,30 @@
+import time
+STARTUP_STARTED_AT = time.perf_counter() # the startup profile counts import time from here
 import tkinter as tk
 from tkinter import messagebox
 import random
-import requests
-import time
 import threading
 import queue
+import concurrent.futures
+import os
+import heapq
+import itertools
+import sqlite3
+import mmap
+import struct
+import zlib
+import array
+import json
+import argparse
+import bisect
+import logging
+import logging.handlers
+import sys
+from urllib.parse import quote
+from collections import OrderedDict, deque
 
 # --- Global Variables ---
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 root = None
 review_frame = None
 language_display_label = None
@@ -17,20 +35,12 @@ choice_buttons = []
 status_label = None
 feedback_label = None
 
-LANGUAGES_SEQUENCE = ["English", "German"]
-current_language_phase_index = 0
-current_language_name = ""
-current_question_index_in_lang = 0
-MAX_QUESTIONS_PER_LANG = 5
-
-master_initial_english_words = []
-english_quiz_source_words = []
-german_quiz_source_words = []
+lang_code_map = {"English": "en", "German": "de", "French": "fr", "Spanish": "es", "Italian": "it"}
 
-lang_code_map = {"English": "en", "German": "de"}
-current_word_data = {}
-
-api_result_queue = queue.Queue()
+# Quiz phases in order. Any language in lang_code_map can be listed; its words are English words translated into it.
+LANGUAGES_SEQUENCE = [name.strip() for name in os.environ.get("VIBLINGO_LANGUAGES", "English,German").split(",")
+                      if name.strip() in lang_code_map] or ["English", "German"]
+MAX_QUESTIONS_PER_LANG = int(os.environ.get("VIBLINGO_QUESTIONS_PER_LANG", "5"))
 
 # --- Colors and Fonts ---
 COLOR_BACKGROUND = "#E0F0E0"
@@ -45,14 +55,279 @@ FONT_STATUS = ("Arial", 10)
 FONT_FEEDBACK = ("Arial", 12, "italic")
 FONT_LANG_DISPLAY = ("Arial", 10, "italic")
 
+# --- Tracing and Metrics (spans -> rotating trace file + in-process histograms) ---
+TRACE_ENABLED = os.environ.get("VIBLINGO_TRACE", "1") != "0"
+TRACE_PATH = os.environ.get("VIBLINGO_TRACE_PATH", os.path.join(APP_DIR, "viblingo_trace.jsonl"))
+TRACE_MAX_BYTES = 1024 * 1024
+TRACE_BACKUP_COUNT = 3
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+INHERITED_SPAN_TAGS = ("session", "provider", "langpair", "language", "cache") # children report these unless they set their own
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1) # last bucket is everything above bounds[-1]
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=1000) # for percentiles
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+
+    def summary(self):
+        values = list(self.recent)
+        return {"count": self.count, "avg": round(self.total / self.count, 1) if self.count else 0.0,
+                "p50": round(percentile(values, 50), 1), "p95": round(percentile(values, 95), 1),
+                "p99": round(percentile(values, 99), 1)}
+
+class MetricsRegistry:
+    def __init__(self, bounds=HISTOGRAM_BUCKETS_MS):
+        self.bounds = bounds
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name, value_ms):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.bounds)
+            histogram.observe(value_ms)
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def summary(self):
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._histograms.items())}
+
+metrics_registry = MetricsRegistry()
+
+class Span:
+    def __init__(self, tracer, name, tags):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+        self.started_at = time.monotonic()
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if stack:
+            parent = stack[-1]
+            for key in INHERITED_SPAN_TAGS:
+                if key in parent.tags: self.tags.setdefault(key, parent.tags[key])
+            self.tags.setdefault("parent", parent.name)
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.tracer._stack().pop()
+        if exc_type is not None: self.tags["outcome"] = exc_type.__name__
+        self.tracer.emit(self.name, time.monotonic() - self.started_at, self.tags)
+        return False
+
+# Every span becomes one JSON line in the trace file, a latency histogram `name` (or `name:metric_key` when
+# the span sets one) and a counter `name.outcome`.
+class Tracer:
+    def __init__(self, registry, path=None, max_bytes=TRACE_MAX_BYTES, backup_count=TRACE_BACKUP_COUNT):
+        self.registry = registry
+        self._local = threading.local()
+        self._logger = None
+        if path:
+            try:
+                handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._logger = logging.getLogger("viblingo.trace")
+                self._logger.propagate = False
+                self._logger.setLevel(logging.INFO)
+                self._logger.addHandler(handler)
+            except OSError as e:
+                print(f"Trace file disabled ({e})")
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None: stack = self._local.stack = []
+        return stack
+
+    def span(self, name, **tags):
+        return Span(self, name, tags)
+
+    # What a span opened on another thread (a pool task) should inherit from the current one, passed in as its tags.
+    def context(self):
+        stack = self._stack()
+        if not stack: return {}
+        parent = stack[-1]
+        context = {key: parent.tags[key] for key in INHERITED_SPAN_TAGS if key in parent.tags}
+        context["parent"] = parent.name
+        return context
+
+    def emit(self, name, duration_seconds, tags):
+        duration_ms = 1000 * duration_seconds
+        tags.setdefault("outcome", "ok")
+        metric_key = tags.pop("metric_key", None)
+        self.registry.observe(f"{name}:{metric_key}" if metric_key else name, duration_ms)
+        self.registry.increment(f"{name}.{tags['outcome']}")
+        if self._logger is not None:
+            record = {"ts": round(time.time(), 3), "span": name, "ms": round(duration_ms, 2), "thread": threading.current_thread().name}
+            record.update(tags)
+            self._logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    # Closes the span for the state a state machine is leaving; returns the time the new state was entered.
+    def transition(self, machine, session_id, old_state, new_state, entered_at):
+        if old_state == new_state: return entered_at
+        now = time.monotonic()
+        self.emit(f"{machine}.state", now - entered_at, {"session": session_id, "state": old_state, "next": new_state, "metric_key": old_state})
+        return now
+
+tracer = Tracer(metrics_registry, TRACE_PATH if TRACE_ENABLED else None)
+
+# --- Startup Profile (cold start budget) ---
+STARTUP_BUDGET_MS = {"import": 400, "first_paint": 600, "first_question": 1500} # ms since STARTUP_STARTED_AT
+STARTUP_PROFILE_EXIT = False # --profile-startup: quit once the first question is on screen
+
+class StartupProfile:
+    def __init__(self, started_at, budget_ms):
+        self.started_at = started_at
+        self.budget_ms = budget_ms
+        self.marks = {} # milestone -> ms since started_at, first time only
+        self.deferred_imports = {} # module -> ms it took when it was imported after startup
+
+    def mark(self, name):
+        if name in self.marks: return
+        self.marks[name] = round(1000 * (time.perf_counter() - self.started_at), 1)
+        metrics_registry.observe(f"startup.{name}", self.marks[name])
+
+    def record_import(self, module, seconds):
+        self.deferred_imports[module] = round(1000 * seconds, 1)
+
+    def over_budget(self):
+        return {name: ms for name, ms in self.marks.items() if ms > self.budget_ms.get(name, float("inf"))}
+
+    def report(self):
+        return {"marks_ms": dict(self.marks), "budget_ms": dict(self.budget_ms),
+                "deferred_imports_ms": dict(self.deferred_imports), "over_budget": self.over_budget()}
+
+startup_profile = StartupProfile(STARTUP_STARTED_AT, STARTUP_BUDGET_MS)
+
+# --- HTTP Client (pooled keep-alive sessions) ---
+RANDOM_WORD_API_URL = os.environ.get("VIBLINGO_RANDOM_WORD_API_URL", "https://random-word-api.vercel.app/api")
+MYMEMORY_API_URL = os.environ.get("VIBLINGO_MYMEMORY_API_URL", "https://api.mymemory.translated.net/get")
+HTTP_POOL_SIZE = 8 # connections kept alive per host
+HTTP_CONNECT_TIMEOUT_SECONDS = 5
+HTTP_READ_TIMEOUT_SECONDS = 15
+HTTP_USE_HTTP2 = os.environ.get("VIBLINGO_HTTP2") == "1" # needs `pip install httpx[http2]`
+
+# Imported with the first HTTP call rather than at startup; requests alone is about half of the import time.
+requests = None
+httpx = None
+_http_import_lock = threading.Lock()
+
+def load_http_libraries(use_http2=False):
+    global requests, httpx
+    with _http_import_lock:
+        if requests is None:
+            started_at = time.perf_counter()
+            import requests
+            import requests.adapters
+            startup_profile.record_import("requests", time.perf_counter() - started_at)
+        if use_http2 and httpx is None:
+            try:
+                import httpx
+            except ImportError:
+                pass
+
+class PooledHttpClient:
+    def __init__(self, pool_size, connect_timeout, read_timeout, use_http2=False):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.timeout = (connect_timeout, read_timeout)
+        self.use_http2 = use_http2
+        self._lock = threading.Lock()
+        self._requests_sent = 0
+        self._client = None
+        self._session = None
+        self._adapter = None
+
+    # Loads the HTTP library and sets up the pool; done by the first request.
+    def connect(self):
+        with self._lock:
+            if self._client is not None or self._session is not None: return
+            load_http_libraries(self.use_http2)
+            if self.use_http2 and httpx is None:
+                print("HTTP/2 requested but httpx is not installed, using requests")
+                self.use_http2 = False
+            if self.use_http2:
+                self._client = httpx.Client(http2=True, timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                                            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size))
+            else:
+                self._adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                self._session = requests.Session()
+                self._session.mount("https://", self._adapter)
+                self._session.mount("http://", self._adapter)
+
+    # GET + raise_for_status + .json(). httpx errors are re-raised as the matching requests
+    # exceptions so callers (and the retry logic) only ever deal with one family.
+    def get_json(self, url, params=None):
+        if self._client is None and self._session is None: self.connect()
+        with self._lock:
+            self._requests_sent += 1
+        if self._client is None:
+            response = self._session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        try:
+            response = self._client.get(url, params=params)
+            response.raise_for_status()
+            return response.json()
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e))
+        except httpx.HTTPStatusError as e:
+            raise requests.HTTPError(str(e), response=e.response)
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e))
+
+    def stats(self):
+        with self._lock:
+            requests_sent = self._requests_sent
+        if self._client is not None:
+            return {"backend": "httpx/http2", "requests": requests_sent}
+        if self._adapter is None:
+            return {"backend": "not connected", "requests": requests_sent}
+        per_host = {}
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None: continue
+            host = f"{pool.scheme}://{pool.host}:{pool.port}" if pool.port else f"{pool.scheme}://{pool.host}"
+            per_host[host] = {"requests": pool.num_requests, "connections_opened": pool.num_connections,
+                              "connections_reused": max(0, pool.num_requests - pool.num_connections)}
+        opened = sum(h["connections_opened"] for h in per_host.values())
+        return {"backend": "requests", "requests": requests_sent, "connections_opened": opened,
+                "connections_reused": max(0, requests_sent - opened), "per_host": per_host}
+
+    def close(self):
+        if self._client is not None: self._client.close()
+        if self._session is not None: self._session.close()
+
+http_client = PooledHttpClient(HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT_SECONDS, HTTP_READ_TIMEOUT_SECONDS, HTTP_USE_HTTP2)
+
 # --- API Functions (Core logic) ---
 def fetch_random_english_words_api_core(count=1):
     try:
-        url = f"https://random-word-api.vercel.app/api?words={count}"
-        # print(f"Fetching from: {url}")
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-        words = response.json()
+        # print(f"Fetching {count} words from: {RANDOM_WORD_API_URL}")
+        words = http_client.get_json(RANDOM_WORD_API_URL, params={"words": count})
         if isinstance(words, list) and all(isinstance(word, str) for word in words):
             filtered_words = [word.lower() for word in words if word.isalpha() and len(word) > 2]
             
@@ -66,10 +341,7 @@ def translate_text_mymemory_core(text, source_lang, target_lang="th"):
     if not text or not text.strip(): return None
     # print(f"Attempting to translate: '{text}' from {source_lang} to {target_lang}")
     try:
-        url = f"https://api.mymemory.translated.net/get?q={requests.utils.quote(text)}&langpair={source_lang}|{target_lang}"
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        data = http_client.get_json(MYMEMORY_API_URL, params={"q": text, "langpair": f"{source_lang}|{target_lang}"})
         if data.get("responseStatus") == 200:
             translated_text = data["responseData"]["translatedText"]
             error_flags = ["NO QUERY SPECIFIED!", "INVALID LANGUAGE PAIR", "PLEASE USE ISO CODE", "INTERNAL ERROR", "NO TRANSLATION FOUND"]
@@ -85,331 +357,2360 @@ def translate_text_mymemory_core(text, source_lang, target_lang="th"):
         # print(f"Error in translate_text_mymemory_core for '{text}': {e}")
         raise
 
-# --- Threaded API Call Wrappers ---
-def call_api_in_thread(api_function, callback_id, *args):
-    def target():
-        try:
-            result = api_function(*args)
-            api_result_queue.put((callback_id, result))
-        except Exception as e:
-            api_result_queue.put((callback_id, e))
-
-    thread = threading.Thread(target=target, daemon=True)
-    thread.start()
+# --- Rate Limiting Scheduler (token bucket per provider + retries) ---
+PRIORITY_CURRENT_QUESTION = 0 # lower runs first
+PRIORITY_INIT = 1
+PRIORITY_PREFETCH = 2
+PRIORITY_BACKGROUND = 3 # preparing the next launch's session
+
+PROVIDER_QUOTAS = { # tokens per second, bucket size
+    "random-word-api": {"rate": 2.0, "burst": 4},
+    "mymemory": {"rate": 1.0, "burst": 3},
+    "lingva": {"rate": 2.0, "burst": 4},
+}
+API_MAX_RETRIES = 4
+API_BACKOFF_BASE_SECONDS = 0.5
+API_BACKOFF_MAX_SECONDS = 8.0
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    # Takes a token and returns 0, or returns how many seconds until one is available.
+    def try_take(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def drain(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+def is_retryable_api_error(error):
+    if requests is None: return False # nothing has gone over HTTP yet
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)): return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+def api_result_outcome(result):
+    if result == "RATE_LIMIT": return "rate_limit"
+    return "ok" if result else "empty"
+
+class RateLimitedScheduler:
+    def __init__(self, quotas):
+        self._cond = threading.Condition()
+        self._buckets = {name: TokenBucket(q["rate"], q["burst"]) for name, q in quotas.items()}
+        self._waiters = {name: [] for name in quotas} # heap of [priority, seq, priority callable or None] per provider
+        self._seq = itertools.count()
+        self._request_time = threading.local() # per thread: seconds spent in requests, throttle and back-off excluded
+        self.retries = 0
+
+    # `on_sent` (optional) is called each time a request from this thread has passed the throttle and goes out.
+    def reset_request_time(self, on_sent=None):
+        self._request_time.seconds, self._request_time.requests = 0.0, 0
+        self._request_time.on_sent = on_sent
+
+    # (seconds, requests) sent from this thread since reset_request_time().
+    def request_time(self):
+        return getattr(self._request_time, "seconds", 0.0), getattr(self._request_time, "requests", 0)
+
+    def _add_request_time(self, seconds):
+        self._request_time.seconds = getattr(self._request_time, "seconds", 0.0) + seconds
+        self._request_time.requests = getattr(self._request_time, "requests", 0) + 1
+
+    # Callable priorities are read again on every wake-up; a ticket that moved re-sorts the heap and
+    # wakes the waiters so a new head can take its turn.
+    def _reprioritize_locked(self, waiters):
+        moved = False
+        for ticket in waiters:
+            if ticket[2] is not None:
+                priority = ticket[2]()
+                if priority != ticket[0]:
+                    ticket[0], moved = priority, True
+        if moved:
+            heapq.heapify(waiters)
+            self._cond.notify_all()
+
+    # Blocks until `provider` has budget and no higher-priority request is waiting for it.
+    # `priority` may be a callable so a prefetch can be promoted while it waits.
+    def acquire(self, provider, priority):
+        with self._cond:
+            ticket = [priority() if callable(priority) else priority, next(self._seq), priority if callable(priority) else None]
+            waiters = self._waiters[provider]
+            heapq.heappush(waiters, ticket)
+            while True:
+                self._reprioritize_locked(waiters)
+                if waiters[0] is ticket:
+                    wait_seconds = self._buckets[provider].try_take()
+                    if wait_seconds == 0:
+                        heapq.heappop(waiters)
+                        self._cond.notify_all()
+                        return
+                    self._cond.wait(wait_seconds)
+                else:
+                    self._cond.wait()
+
+    def _back_off(self, provider, attempt):
+        with self._cond:
+            self.retries += 1
+            self._buckets[provider].drain() # everyone slows down after a 429, not just this caller
+        with tracer.span("api.backoff", attempt=attempt):
+            time.sleep(random.uniform(0, min(API_BACKOFF_MAX_SECONDS, API_BACKOFF_BASE_SECONDS * (2 ** attempt))))
+
+    def call(self, provider, priority, api_function, *args):
+        with tracer.span("api.call", provider=provider, metric_key=provider) as call_span:
+            for attempt in range(API_MAX_RETRIES + 1):
+                call_span.tag(attempts=attempt + 1)
+                with tracer.span("api.throttle_wait", metric_key=provider):
+                    self.acquire(provider, priority)
+                on_sent = getattr(self._request_time, "on_sent", None)
+                if on_sent is not None: on_sent()
+                sent_at = time.monotonic()
+                try:
+                    with tracer.span("api.request", attempt=attempt, metric_key=provider) as request_span:
+                        result = api_function(*args)
+                        request_span.tag(outcome=api_result_outcome(result))
+                except Exception as e:
+                    self._add_request_time(time.monotonic() - sent_at)
+                    if attempt == API_MAX_RETRIES or not is_retryable_api_error(e): raise
+                    print(f"{provider} call failed ({e}), retry {attempt+1}/{API_MAX_RETRIES}")
+                    self._back_off(provider, attempt)
+                    continue
+                self._add_request_time(time.monotonic() - sent_at)
+                if result == "RATE_LIMIT" and attempt < API_MAX_RETRIES:
+                    self._back_off(provider, attempt)
+                    continue
+                call_span.tag(outcome=request_span.tags["outcome"])
+                return result
+
+api_scheduler = RateLimitedScheduler(PROVIDER_QUOTAS)
+
+def fetch_random_english_words(count=1, priority=PRIORITY_PREFETCH):
+    return api_scheduler.call("random-word-api", priority, fetch_random_english_words_api_core, count)
+
+# --- Worker Pool (bounded executor for all background work) ---
+WORKER_POOL_SIZE = 8
+WORKER_SHUTDOWN_DRAIN_SECONDS = 2.0
+
+def percentile(values, pct):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+class CancellationToken:
+    def __init__(self, label=""):
+        self.label = label
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+# Fixed set of worker threads fed from one queue. Tasks are ordered by lane (the PRIORITY_* values,
+# lower first) and skipped if their cancellation token was cancelled before they started.
+class WorkerPool:
+    def __init__(self, num_workers, name="worker"):
+        self._cond = threading.Condition()
+        self._tasks = [] # heap of (lane, seq, future, fn, args, token, submitted_at)
+        self._seq = itertools.count()
+        self._shutdown = False
+        self._latencies = deque(maxlen=2000) # submit -> finish, seconds
+        self.active = 0
+        self.completed = 0
+        self.cancelled = 0
+        self._threads = [threading.Thread(target=self._worker_loop, name=f"{name}-{i}", daemon=True) for i in range(num_workers)]
+        for thread in self._threads: thread.start()
+
+    def submit(self, fn, *args, lane=PRIORITY_PREFETCH, token=None):
+        future = concurrent.futures.Future()
+        with self._cond:
+            if self._shutdown:
+                future.cancel()
+                return future
+            heapq.heappush(self._tasks, (lane, next(self._seq), future, fn, args, token, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._tasks and not self._shutdown:
+                    self._cond.wait()
+                if not self._tasks: return
+                lane, _, future, fn, args, token, submitted_at = heapq.heappop(self._tasks)
+                if (token is not None and token.cancelled) or not future.set_running_or_notify_cancel():
+                    self.cancelled += 1
+                    future.cancel()
+                    continue
+                self.active += 1
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            with self._cond:
+                self.active -= 1
+                self.completed += 1
+                self._latencies.append(time.monotonic() - submitted_at)
+
+    # Stops taking work, drops what has not started and gives running tasks a moment to finish.
+    def shutdown(self, drain_seconds=WORKER_SHUTDOWN_DRAIN_SECONDS):
+        with self._cond:
+            self._shutdown = True
+            for task in self._tasks:
+                task[2].cancel()
+                self.cancelled += 1
+            self._tasks = []
+            self._cond.notify_all()
+        deadline = time.monotonic() + drain_seconds
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def metrics(self):
+        with self._cond:
+            latencies = list(self._latencies)
+            return {
+                "workers": len(self._threads),
+                "active": self.active,
+                "queue_depth": len(self._tasks),
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "latency_p50_ms": round(1000 * percentile(latencies, 50), 1),
+                "latency_p95_ms": round(1000 * percentile(latencies, 95), 1),
+                "latency_p99_ms": round(1000 * percentile(latencies, 99), 1),
+            }
 
-# --- State Variables for Initialization Process ---
-INITIALIZATION_STATE = "IDLE"
-init_master_words_temp_raw = []
-init_german_sources_collected = []
-init_eng_for_german_idx = 0
-init_english_words_for_german_candidates = []
+worker_pool = WorkerPool(WORKER_POOL_SIZE)
+
+# --- Bundled Offline Lexicon (memory-mapped) ---
+DATA_SOURCE_MODE = os.environ.get("VIBLINGO_SOURCE", "fallback") # "online", "offline" or "fallback" (network first, lexicon when it fails)
+LEXICON_TSV_PATH = os.path.join(APP_DIR, "lexicon.tsv")
+LEXICON_BIN_PATH = os.path.join(APP_DIR, "viblingo_lexicon.bin")
+LEXICON_MAGIC = b"VBLX"
+LEXICON_VERSION = 1
+LEXICON_HEADER = struct.Struct("<4sII") # magic, version, entry count
+LEXICON_COLUMNS = {"en": 0, "de": 1, "th": 2} # column 3 is the part of speech
+
+# Binary layout after the header: uint32 record offsets (count + 1), uint32 record numbers
+# sorted by German key (count), then the UTF-8 records "english\tgerman\tthai\tpos" sorted by English key.
+def build_lexicon_file(tsv_path, bin_path):
+    entries = []
+    with open(tsv_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"): continue
+            fields = [field.strip() for field in line.rstrip("\n").split("\t")]
+            if len(fields) == 4 and all(fields): entries.append(fields)
+    entries.sort(key=lambda entry: entry[0].casefold())
+
+    blob = bytearray()
+    offsets = array.array("I", [0])
+    for entry in entries:
+        blob += "\t".join(entry).encode("utf-8")
+        offsets.append(len(blob))
+    german_order = array.array("I", sorted(range(len(entries)), key=lambda i: entries[i][1].casefold()))
+
+    tmp_path = bin_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(LEXICON_HEADER.pack(LEXICON_MAGIC, LEXICON_VERSION, len(entries)))
+        f.write(offsets.tobytes())
+        f.write(german_order.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, bin_path)
+    return len(entries)
+
+class BundledLexicon:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = LEXICON_HEADER.unpack_from(self._mm, 0)
+        if magic != LEXICON_MAGIC or version != LEXICON_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {LEXICON_VERSION} lexicon file")
+        self.count = count
+        self._view = memoryview(self._mm)
+        pos = LEXICON_HEADER.size
+        self._offsets = self._view[pos:pos + 4 * (count + 1)].cast("I")
+        pos += 4 * (count + 1)
+        self._german_order = self._view[pos:pos + 4 * count].cast("I")
+        self._blob_start = pos + 4 * count
+
+    def entry(self, record_index):
+        start = self._blob_start + self._offsets[record_index]
+        end = self._blob_start + self._offsets[record_index + 1]
+        return self._mm[start:end].decode("utf-8").split("\t")
+
+    def _record_at(self, position, column):
+        return self._german_order[position] if column == 1 else position
+
+    def find(self, word, lang):
+        column = LEXICON_COLUMNS.get(lang)
+        if column not in (0, 1) or not word: return None # only English and German keys are indexed
+        key = word.strip().casefold()
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.entry(self._record_at(mid, column))[column].casefold() < key: lo = mid + 1
+            else: hi = mid
+        if lo < self.count:
+            entry = self.entry(self._record_at(lo, column))
+            if entry[column].casefold() == key: return entry
+        return None
 
-# --- Initialization Logic (Threaded) ---
-def start_initialization_process():
-    global INITIALIZATION_STATE, root, initial_load_status_label, review_frame
-    global master_initial_english_words, english_quiz_source_words, german_quiz_source_words
-    global init_master_words_temp_raw, init_german_sources_collected, init_eng_for_german_idx, init_english_words_for_german_candidates
-
-    master_initial_english_words = []
-    english_quiz_source_words = []
-    german_quiz_source_words = []
-    init_master_words_temp_raw = []
-    init_german_sources_collected = []
-    init_eng_for_german_idx = 0
-    init_english_words_for_german_candidates = []
-
-    review_frame.pack_forget() # Hide main quiz UI
-    initial_load_status_label.config(text="1/3: ดึงคำศัพท์อังกฤษตั้งต้น...")
-    initial_load_status_label.place(relx=0.5, rely=0.5, anchor="center") # Show loading label
-    root.update_idletasks()
+    def translate(self, text, source_lang, target_lang):
+        if target_lang not in LEXICON_COLUMNS: return None
+        entry = self.find(text, source_lang)
+        return entry[LEXICON_COLUMNS[target_lang]] if entry else None
 
-    INITIALIZATION_STATE = "FETCHING_MASTER_WORDS"
-    num_eng_for_eng_quiz = MAX_QUESTIONS_PER_LANG
-    num_eng_to_attempt_for_german = MAX_QUESTIONS_PER_LANG + 5
-    total_unique_english_words_needed_for_sources = num_eng_for_eng_quiz + num_eng_to_attempt_for_german
-    num_master_words_to_fetch = total_unique_english_words_needed_for_sources * 2
+    def random_entries(self, count):
+        return [self.entry(i) for i in random.sample(range(self.count), min(count, self.count))]
 
-    call_api_in_thread(fetch_random_english_words_api_core, "INIT_MASTER_WORDS_RESULT", num_master_words_to_fetch)
-    root.after(100, process_api_queue_for_init)
+    def close(self):
+        for attr in ("_offsets", "_german_order", "_view"):
+            view = getattr(self, attr, None)
+            if view is not None: view.release()
+        self._mm.close()
+        self._file.close()
 
+def load_bundled_lexicon():
+    try:
+        if os.path.exists(LEXICON_TSV_PATH) and (not os.path.exists(LEXICON_BIN_PATH) or
+                                                 os.path.getmtime(LEXICON_BIN_PATH) < os.path.getmtime(LEXICON_TSV_PATH)):
+            build_lexicon_file(LEXICON_TSV_PATH, LEXICON_BIN_PATH)
+        return BundledLexicon(LEXICON_BIN_PATH)
+    except (OSError, ValueError) as e:
+        print(f"Offline lexicon unavailable: {e}")
+        return None
 
-def process_api_queue_for_init():
-    global INITIALIZATION_STATE, root, api_result_queue, initial_load_status_label, review_frame
-    global master_initial_english_words, english_quiz_source_words, german_quiz_source_words
-    global init_master_words_temp_raw, init_german_sources_collected, init_eng_for_german_idx, init_english_words_for_german_candidates
+bundled_lexicon = load_bundled_lexicon() if DATA_SOURCE_MODE != "online" else None
+
+# --- Translation Providers (pluggable backends, hedged requests, circuit breakers) ---
+LINGVA_API_URL = os.environ.get("VIBLINGO_LINGVA_API_URL", "") # e.g. https://lingva.ml/api/v1, off unless set
+TRANSLATION_PROVIDER_ORDER = [name.strip() for name in os.environ.get("VIBLINGO_PROVIDERS", "mymemory,lingva,lexicon").split(",") if name.strip()]
+PROVIDER_POOL_SIZE = 24 # one primary plus a hedge for every worker_pool / hop_pool thread, so calls rarely queue here
+HEDGE_DEFAULT_DELAY_SECONDS = 1.0 # until a provider has HEDGE_MIN_SAMPLES latencies
+HEDGE_MIN_SAMPLES = 10
+HEDGE_MIN_DELAY_SECONDS = 0.05
+HEDGE_MAX_DELAY_SECONDS = 5.0
+HEDGE_LATENCY_PERCENTILE = 90
+CIRCUIT_FAILURE_THRESHOLD = 3 # consecutive failures that open a provider's circuit
+CIRCUIT_OPEN_SECONDS = 30.0 # then one probe request is let through
+HEALTH_SCORE_DECAY = 0.8 # EWMA weight of the old score
+HEALTH_MIN_SCORE = 0.5 # providers below it are only tried after the healthy ones
+
+def translate_text_lingva_core(text, source_lang, target_lang="th"):
+    if not text or not text.strip(): return None
+    data = http_client.get_json(f"{LINGVA_API_URL.rstrip('/')}/{source_lang}/{target_lang}/{quote(text.strip(), safe='')}")
+    translation = data.get("translation") if isinstance(data, dict) else None
+    return translation.strip() if translation and translation.strip() else None
+
+# A backend returns a translation, None (no translation) or "RATE_LIMIT", and raises on transport errors.
+# translate_batch returns a list aligned with `texts` (items may be None) or one of those for the whole batch.
+class TranslationProvider:
+    name = ""
+
+    def available(self, source_lang, target_lang):
+        return True
+
+    def translate(self, text, source_lang, target_lang, priority):
+        raise NotImplementedError
+
+    def translate_batch(self, texts, source_lang, target_lang, priority):
+        return [self.translate(text, source_lang, target_lang, priority) for text in texts]
+
+class MyMemoryProvider(TranslationProvider):
+    name = "mymemory"
+
+    def translate(self, text, source_lang, target_lang, priority):
+        return api_scheduler.call("mymemory", priority, translate_text_mymemory_core, text, source_lang, target_lang)
+
+    def translate_batch(self, texts, source_lang, target_lang, priority):
+        if len(texts) == 1: return [self.translate(texts[0], source_lang, target_lang, priority)]
+        return api_scheduler.call("mymemory", priority, translate_batch_mymemory_core, texts, source_lang, target_lang)
+
+class LingvaProvider(TranslationProvider):
+    name = "lingva"
+
+    def available(self, source_lang, target_lang):
+        return bool(LINGVA_API_URL)
+
+    def translate(self, text, source_lang, target_lang, priority):
+        return api_scheduler.call("lingva", priority, translate_text_lingva_core, text, source_lang, target_lang)
+
+# The bundled lexicon as a backend: answers at once, but only for the words and languages it has.
+class LexiconProvider(TranslationProvider):
+    name = "lexicon"
+
+    def available(self, source_lang, target_lang):
+        return bundled_lexicon is not None and source_lang in LEXICON_COLUMNS and target_lang in LEXICON_COLUMNS
+
+    def translate(self, text, source_lang, target_lang, priority):
+        return bundled_lexicon.translate(text, source_lang, target_lang)
+
+TRANSLATION_PROVIDER_TYPES = {"mymemory": MyMemoryProvider, "lingva": LingvaProvider, "lexicon": LexiconProvider}
+
+class ProviderHealth:
+    def __init__(self):
+        self.latencies = deque(maxlen=200) # seconds of successful calls
+        self.score = 1.0
+        self.consecutive_failures = 0
+        self.circuit = "CLOSED" # CLOSED, OPEN or HALF_OPEN (one probe in flight)
+        self.opened_at = 0.0
+        self.calls = 0
+        self.failures = 0
+
+    def hedge_delay(self):
+        if len(self.latencies) < HEDGE_MIN_SAMPLES: return HEDGE_DEFAULT_DELAY_SECONDS
+        return min(HEDGE_MAX_DELAY_SECONDS, max(HEDGE_MIN_DELAY_SECONDS, percentile(self.latencies, HEDGE_LATENCY_PERCENTILE)))
+
+# Sends each lookup to the healthiest provider first. If it has not answered within its p90 latency the
+# next one is asked too and the first usable answer wins; the slower call finishes in the background and
+# only updates health. Providers whose circuit is open are skipped while another one can answer.
+class TranslationRouter:
+    def __init__(self, providers, pool):
+        self.providers = providers
+        self.pool = pool # leaf tasks only: one provider call each
+        self._lock = threading.Lock()
+        self.health = {provider.name: ProviderHealth() for provider in providers}
+        self.hedges = 0
+
+    def _probe_due_locked(self, health):
+        return health.circuit == "OPEN" and time.monotonic() - health.opened_at >= CIRCUIT_OPEN_SECONDS
+
+    # Read-only: 0 healthy or due for its probe, 1 degraded, 2 open (or its probe is still in flight).
+    def _rank_locked(self, health):
+        if self._probe_due_locked(health): return 0
+        if health.circuit != "CLOSED": return 2
+        return int(health.score < HEALTH_MIN_SCORE)
+
+    # Healthy providers (and circuits due for a probe) in configured order, then degraded ones, then open circuits as a last resort.
+    def _candidates(self, source_lang, target_lang):
+        providers = [provider for provider in self.providers if provider.available(source_lang, target_lang)]
+        with self._lock:
+            rank = {provider.name: self._rank_locked(self.health[provider.name]) for provider in providers}
+        return sorted(providers, key=lambda provider: rank[provider.name])
+
+    def _record(self, provider, ok, seconds):
+        with self._lock:
+            health = self.health[provider.name]
+            health.calls += 1
+            health.score = HEALTH_SCORE_DECAY * health.score + (1 - HEALTH_SCORE_DECAY) * (1.0 if ok else 0.0)
+            if ok:
+                health.latencies.append(seconds)
+                health.consecutive_failures = 0
+                if health.circuit != "CLOSED":
+                    print(f"Translation provider {provider.name} recovered, closing its circuit")
+                    health.score = 1.0 # back in rotation, not behind the providers that covered for it
+                health.circuit = "CLOSED"
+                return
+            health.failures += 1
+            health.consecutive_failures += 1
+            if health.circuit == "HALF_OPEN" or (health.circuit == "CLOSED" and health.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD):
+                print(f"Translation provider {provider.name} failing ({health.consecutive_failures} in a row), opening its circuit")
+                health.circuit = "OPEN"
+                health.opened_at = time.monotonic()
+
+    # Health latency is the provider's own response time: the HTTP requests when it sends any, else the whole
+    # call (the lexicon). Time queued in the provider pool or in our own api_scheduler throttle is left out.
+    # `sent` resolves with the time the first request went out (or when the call ends without one).
+    def _call(self, provider, method, args, sent, context):
+        def mark_sent():
+            if not sent.done(): sent.set_result(time.monotonic())
+        with self._lock:
+            health = self.health[provider.name]
+            if self._probe_due_locked(health): health.circuit = "HALF_OPEN" # this call is the probe
+        api_scheduler.reset_request_time(on_sent=mark_sent)
+        started_at = time.monotonic()
+        try:
+            with tracer.span("provider.call", **dict(context, provider=provider.name, metric_key=provider.name)) as span:
+                try:
+                    result = getattr(provider, method)(*args)
+                except Exception:
+                    self._record(provider, False, self._response_seconds(started_at))
+                    raise
+                span.tag(outcome="ok" if isinstance(result, list) else api_result_outcome(result))
+                self._record(provider, result != "RATE_LIMIT", self._response_seconds(started_at))
+                return result
+        finally:
+            api_scheduler.reset_request_time()
+            mark_sent()
+
+    def _submit_call(self, provider, method, args, lane, context):
+        sent = concurrent.futures.Future()
+        return self.pool.submit(self._call, provider, method, args, sent, context, lane=lane), sent
+
+    def _response_seconds(self, started_at):
+        seconds, requests_sent = api_scheduler.request_time()
+        return seconds if requests_sent else time.monotonic() - started_at
+
+    # Without a usable answer: the exception if any provider raised, else the preferred provider's answer.
+    def _hedged(self, method, args, source_lang, target_lang, is_usable):
+        candidates = self._candidates(source_lang, target_lang)
+        if not candidates: raise RuntimeError(f"No translation provider for {source_lang}|{target_lang}")
+        priority = args[-1]
+        lane = priority() if callable(priority) else priority
+        context = dict(tracer.context(), cache="miss") # the calls run on provider_pool threads; callers only get here on a cache miss
+        future, last_sent = self._submit_call(candidates[0], method, args, lane, context)
+        pending = {future: 0}
+        next_index = 1
+        answers, error = {}, None
+        while pending:
+            # The hedge clock starts when the last call's request is sent, not while it waits for our own throttle.
+            waiting_on, delay = set(pending), None
+            if next_index < len(candidates):
+                if last_sent.done():
+                    with self._lock:
+                        delay = max(0.0, last_sent.result() + self.health[candidates[next_index - 1].name].hedge_delay() - time.monotonic())
+                else:
+                    waiting_on.add(last_sent)
+            done, _ = concurrent.futures.wait(waiting_on, timeout=delay, return_when=concurrent.futures.FIRST_COMPLETED)
+            done = [future for future in done if future in pending]
+            if not done and delay is None: continue # only the request went out, the hedge clock starts now
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if is_usable(result): return result
+                answers[index] = result
+            if next_index < len(candidates): # the last one is too slow (a hedge) or answered without a usable result
+                if not done:
+                    self.hedges += 1
+                    metrics_registry.increment("provider.hedge")
+                future, last_sent = self._submit_call(candidates[next_index], method, args, lane, context)
+                pending[future] = next_index
+                next_index += 1
+        if error is not None: raise error
+        return answers[min(answers)]
+
+    def translate(self, text, source_lang, target_lang, priority):
+        return self._hedged("translate", (text, source_lang, target_lang, priority), source_lang, target_lang,
+                            lambda result: bool(result) and result != "RATE_LIMIT")
+
+    def translate_batch(self, texts, source_lang, target_lang, priority):
+        return self._hedged("translate_batch", (texts, source_lang, target_lang, priority), source_lang, target_lang,
+                            lambda result: isinstance(result, list) and all(is_valid_batch_item(item) for item in result))
+
+    def metrics(self):
+        with self._lock:
+            return {name: {"circuit": health.circuit, "score": round(health.score, 2), "calls": health.calls, "failures": health.failures,
+                           "hedge_delay_ms": round(1000 * health.hedge_delay(), 1)} for name, health in self.health.items()}
+
+provider_pool = WorkerPool(PROVIDER_POOL_SIZE, "provider")
+translation_router = TranslationRouter([TRANSLATION_PROVIDER_TYPES[name]() for name in TRANSLATION_PROVIDER_ORDER if name in TRANSLATION_PROVIDER_TYPES],
+                                       provider_pool)
+
+# --- Translation Cache (SQLite on disk + in-memory LRU) ---
+CACHE_DB_PATH = os.environ.get("VIBLINGO_CACHE_PATH", os.path.join(APP_DIR, "viblingo_cache.sqlite3"))
+CACHE_TTL_SECONDS = 30 * 24 * 3600
+CACHE_NEGATIVE_TTL_SECONDS = 24 * 3600 # "NO TRANSLATION FOUND" may get fixed upstream, keep it shorter
+CACHE_MAX_DISK_ENTRIES = 50000
+CACHE_MEMORY_LRU_SIZE = 2048
+CACHE_PRUNE_EVERY_N_WRITES = 200
+
+class TranslationCache:
+    def __init__(self, db_path, ttl_seconds, negative_ttl_seconds, max_disk_entries, memory_size):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.memory_size = memory_size
+        self._lock = threading.Lock()
+        self._memory = OrderedDict() # key -> (translation or None, expires_at)
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("""CREATE TABLE IF NOT EXISTS translations (
+                                    text TEXT NOT NULL, source_lang TEXT NOT NULL, target_lang TEXT NOT NULL,
+                                    translation TEXT, created_at REAL NOT NULL, expires_at REAL NOT NULL,
+                                    PRIMARY KEY (text, source_lang, target_lang))""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_translations_created ON translations (created_at)")
+            self._db.commit()
+            self._prune_locked()
+        except sqlite3.Error as e:
+            print(f"Translation cache disabled on disk ({db_path}): {e}")
+            self._db = None
+
+    @staticmethod
+    def _key(text, source_lang, target_lang):
+        return (text.strip(), source_lang, target_lang)
+
+    # Returns (hit, translation). A hit with translation None is a cached negative result.
+    def get(self, text, source_lang, target_lang):
+        key = self._key(text, source_lang, target_lang)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[0]
+                del self._memory[key]
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT translation, expires_at FROM translations WHERE text=? AND source_lang=? AND target_lang=?", key).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Translation cache read error: {e}")
+                    row = None
+                if row is not None:
+                    if row[1] > now:
+                        self._remember_locked(key, row[0], row[1])
+                        self.hits += 1
+                        return True, row[0]
+                    self._db.execute("DELETE FROM translations WHERE text=? AND source_lang=? AND target_lang=?", key)
+                    self._db.commit()
+            self.misses += 1
+            return False, None
+
+    def put(self, text, source_lang, target_lang, translation):
+        key = self._key(text, source_lang, target_lang)
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if translation is not None else self.negative_ttl_seconds)
+        with self._lock:
+            self._remember_locked(key, translation, expires_at)
+            if self._db is None: return
+            try:
+                self._db.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)", key + (translation, now, expires_at))
+                self._db.commit()
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= CACHE_PRUNE_EVERY_N_WRITES:
+                    self._prune_locked()
+            except sqlite3.Error as e:
+                print(f"Translation cache write error: {e}")
+
+    def _remember_locked(self, key, translation, expires_at):
+        self._memory[key] = (translation, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _prune_locked(self):
+        self._writes_since_prune = 0
+        if self._db is None: return
+        self._db.execute("DELETE FROM translations WHERE expires_at <= ?", (time.time(),))
+        self._db.execute("""DELETE FROM translations WHERE rowid IN (
+                                SELECT rowid FROM translations ORDER BY created_at DESC LIMIT -1 OFFSET ?)""", (self.max_disk_entries,))
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+translation_cache = TranslationCache(CACHE_DB_PATH, CACHE_TTL_SECONDS, CACHE_NEGATIVE_TTL_SECONDS,
+                                     CACHE_MAX_DISK_ENTRIES, CACHE_MEMORY_LRU_SIZE)
+
+# Local answers first: the lexicon in offline mode, otherwise the cache (falling back to the
+# lexicon for cached negatives). Returns (hit, translation, lexicon_translation).
+def lookup_translation_locally(text, source_lang, target_lang):
+    lexicon_translation = bundled_lexicon.translate(text, source_lang, target_lang) if bundled_lexicon else None
+    if DATA_SOURCE_MODE == "offline":
+        return True, lexicon_translation, lexicon_translation
+    hit, cached_translation = translation_cache.get(text, source_lang, target_lang)
+    if hit:
+        return True, (cached_translation if cached_translation is not None else lexicon_translation), lexicon_translation
+    return False, None, lexicon_translation
+
+# Cache in front of the translation providers. Only cache misses spend rate-limit budget.
+# With a bundled lexicon the lexicon answers in offline mode, and stands in when MyMemory fails in fallback mode.
+def translate_text_cached(text, source_lang, target_lang="th", priority=PRIORITY_PREFETCH):
+    if not text or not text.strip(): return None
+    with tracer.span("translate", langpair=f"{source_lang}|{target_lang}") as span:
+        hit, translation, lexicon_translation = lookup_translation_locally(text, source_lang, target_lang)
+        span.tag(cache="hit" if hit else "miss", metric_key="hit" if hit else "miss")
+        if hit:
+            span.tag(outcome=api_result_outcome(translation))
+            return translation
+        try:
+            result = translation_router.translate(text, source_lang, target_lang, priority)
+        except Exception:
+            if not lexicon_translation: raise
+            span.tag(outcome="lexicon")
+            return lexicon_translation
+        if result != "RATE_LIMIT":
+            translation_cache.put(text, source_lang, target_lang, result)
+        if (result is None or result == "RATE_LIMIT") and lexicon_translation:
+            span.tag(outcome="lexicon")
+            return lexicon_translation
+        span.tag(outcome=api_result_outcome(result))
+        return result
+
+# --- Batch Translation (several words per MyMemory request) ---
+MYMEMORY_MAX_QUERY_BYTES = 450 # MyMemory refuses q longer than 500 bytes
+BATCH_TRANSLATION_DELIMITER = "\n"
+
+# Translates delimiter-joined words in one request. Returns a list aligned with `texts`,
+# None when the response could not be split back, or "RATE_LIMIT".
+def translate_batch_mymemory_core(texts, source_lang, target_lang="th"):
+    result = translate_text_mymemory_core(BATCH_TRANSLATION_DELIMITER.join(texts), source_lang, target_lang)
+    if result is None or result == "RATE_LIMIT": return result
+    parts = [part.strip() for part in result.split(BATCH_TRANSLATION_DELIMITER)]
+    if len(parts) != len(texts):
+        print(f"Batch translation came back with {len(parts)} parts for {len(texts)} words, translating them one by one")
+        return None
+    return parts
+
+def is_valid_batch_item(translation):
+    if not translation or BATCH_TRANSLATION_DELIMITER in translation: return False
+    error_flags = ["NO QUERY SPECIFIED!", "INVALID LANGUAGE PAIR", "PLEASE USE ISO CODE", "INTERNAL ERROR", "NO TRANSLATION FOUND"]
+    return not any(flag.lower() in translation.lower() for flag in error_flags)
+
+def split_into_query_chunks(texts):
+    chunks, chunk, chunk_bytes = [], [], 0
+    delimiter_bytes = len(BATCH_TRANSLATION_DELIMITER.encode("utf-8"))
+    for text in texts:
+        text_bytes = len(text.encode("utf-8"))
+        if chunk and chunk_bytes + delimiter_bytes + text_bytes > MYMEMORY_MAX_QUERY_BYTES:
+            chunks.append(chunk)
+            chunk, chunk_bytes = [], 0
+        chunk_bytes += text_bytes + (delimiter_bytes if chunk else 0)
+        chunk.append(text)
+    if chunk: chunks.append(chunk)
+    return chunks
+
+# Translates many words of one langpair with as few requests as possible. Returns {stripped text: result},
+# where a result is a translation, None, "RATE_LIMIT" or the Exception raised for that word.
+def translate_many(texts, source_lang, target_lang="th", priority=PRIORITY_PREFETCH):
+    with tracer.span("translate.batch", langpair=f"{source_lang}|{target_lang}") as span:
+        results = {}
+        misses = []
+        for text in dict.fromkeys(t.strip() for t in texts if t and t.strip()):
+            hit, translation, _ = lookup_translation_locally(text, source_lang, target_lang)
+            if hit: results[text] = translation
+            else: misses.append(text)
+        span.tag(words=len(results) + len(misses), cache_hits=len(results))
+        for chunk in split_into_query_chunks(misses):
+            parts = None
+            if len(chunk) > 1:
+                try:
+                    parts = translation_router.translate_batch(chunk, source_lang, target_lang, priority)
+                except Exception as e:
+                    print(f"Batch translation of {len(chunk)} words failed: {e}")
+            for i, text in enumerate(chunk):
+                if isinstance(parts, list) and is_valid_batch_item(parts[i]):
+                    translation_cache.put(text, source_lang, target_lang, parts[i])
+                    results[text] = parts[i]
+                    continue
+                try:
+                    results[text] = translate_text_cached(text, source_lang, target_lang, priority)
+                except Exception as e:
+                    results[text] = e
+        for text, translation in results.items():
+            translation_graph.learn(text, source_lang, target_lang, translation)
+        return results
+
+# --- Translation Graph (cheapest route to a gloss) ---
+TRANSLATION_GRAPH_MAX_NODES = 20000
+HOP_POOL_SIZE = 4
+
+hop_pool = WorkerPool(HOP_POOL_SIZE, "hop") # leaf tasks only (one translate_many each), so any thread may wait on them
+
+# Remembers every (word, language) -> translation edge seen, in both directions, so a word can reach the
+# target language through a pivot (e.g. German word -> the English word it was translated from -> cached Thai).
+class TranslationGraph:
+    def __init__(self, max_nodes):
+        self.max_nodes = max_nodes
+        self._lock = threading.Lock()
+        self._edges = OrderedDict() # (lang, lower-case text) -> {other lang: text}
+
+    def learn(self, text, source_lang, target_lang, translation):
+        if not text or not is_usable_translation(translation) or not translation.strip(): return
+        text, translation = text.strip(), translation.strip()
+        with self._lock:
+            self._edges.setdefault((source_lang, text.lower()), {})[target_lang] = translation
+            self._edges.setdefault((target_lang, translation.lower()), {}).setdefault(source_lang, text)
+            while len(self._edges) > self.max_nodes:
+                self._edges.popitem(last=False)
+
+    def neighbors(self, text, lang):
+        with self._lock:
+            return dict(self._edges.get((lang, text.strip().lower()), {}))
+
+    # Free routes only: the cached direct translation, or a cached translation of a known neighbour.
+    def _cached_route(self, text, lang, target_lang):
+        hit, translation, _ = lookup_translation_locally(text, lang, target_lang)
+        if hit and is_usable_translation(translation): return "cached", translation
+        for pivot_lang, pivot_text in self.neighbors(text, lang).items():
+            if pivot_lang == target_lang: return "cached", pivot_text
+            hit, translation, _ = lookup_translation_locally(pivot_text, pivot_lang, target_lang)
+            if hit and is_usable_translation(translation): return "pivot_cached", translation
+        return None
 
+    # Translates (text, lang) items into target_lang with as few requests as possible: free routes first, then
+    # one batch per source language, where an item whose neighbour is already in another batch rides along with it.
+    # The batches run concurrently. Returns {(stripped text, lang): translation / None / "RATE_LIMIT" / Exception}.
+    def translate(self, items, target_lang="th", priority=PRIORITY_PREFETCH):
+        with tracer.span("translate.graph", langpair=f"*|{target_lang}") as span:
+            results, routes = {}, {}
+            unresolved = []
+            for text, lang in dict.fromkeys((text.strip(), lang) for text, lang in items if text and text.strip()):
+                route = self._cached_route(text, lang, target_lang)
+                if route is None: unresolved.append((text, lang))
+                else: routes[(text, lang)], results[(text, lang)] = route
+
+            batches = {} # source lang -> {text to send: [item keys]}
+            for key in unresolved:
+                batches.setdefault(key[1], {}).setdefault(key[0], []).append(key)
+            for text, lang in unresolved:
+                if len(batches.get(lang, {})) != 1: continue # its own batch is shared anyway
+                for pivot_lang, pivot_text in self.neighbors(text, lang).items():
+                    if pivot_lang in batches and pivot_lang not in (lang, target_lang):
+                        del batches[lang]
+                        batches[pivot_lang].setdefault(pivot_text, []).append((text, lang))
+                        break
+
+            lane = priority() if callable(priority) else priority
+            planned = list(batches.items())
+            futures = [hop_pool.submit(translate_many, list(texts), lang, target_lang, priority, lane=lane) for lang, texts in planned[1:]]
+            for (lang, texts), future in zip(planned, [None] + futures):
+                try:
+                    translated = translate_many(list(texts), lang, target_lang, priority) if future is None else future.result()
+                except Exception as e:
+                    translated = {text: e for text in texts}
+                for hop_text, keys in texts.items():
+                    for key in keys:
+                        results[key] = translated.get(hop_text)
+                        routes[key] = "hop" if key[1] == lang else "pivot_hop"
+                        if routes[key] == "pivot_hop" and not is_usable_translation(results[key]):
+                            results[key] = translate_many([key[0]], key[1], target_lang, priority).get(key[0])
+                            routes[key] = "hop"
+
+            for route in routes.values(): metrics_registry.increment(f"translate.route.{route}")
+            span.tag(requests=len(planned), routes=sorted(routes.values()))
+            return results
+
+translation_graph = TranslationGraph(TRANSLATION_GRAPH_MAX_NODES)
+
+# --- Result Dispatcher (futures + Tk virtual event instead of polling) ---
+RESULT_READY_EVENT = "<<ApiResultReady>>"
+
+# Worker threads hand finished results to a per-pipeline queue and wake the Tk main loop with a
+# virtual event; the completion handlers then run on the Tk thread. Without an attached widget
+# (headless use) handlers run straight away on the worker thread.
+class ResultDispatcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = {} # pipeline -> queue.Queue of (handler, result)
+        self._error_handlers = {}
+        self._widget = None
+        self._wake_pending = False
+
+    def attach(self, widget):
+        self._widget = widget
+        widget.bind(RESULT_READY_EVENT, self._drain)
+        widget.after_idle(self._drain) # anything that finished before mainloop started
+
+    def set_error_handler(self, pipeline, handler):
+        self._error_handlers[pipeline] = handler
+
+    def _queue(self, pipeline):
+        with self._lock:
+            return self._queues.setdefault(pipeline, queue.Queue())
+
+    def post(self, pipeline, handler, result):
+        if self._widget is None:
+            self._run(pipeline, handler, result)
+            return
+        self._queue(pipeline).put((handler, result))
+        with self._lock:
+            if self._wake_pending: return
+            self._wake_pending = True
+        try:
+            self._widget.event_generate(RESULT_READY_EVENT, when="tail")
+        except (tk.TclError, RuntimeError):
+            with self._lock: # main loop not running (yet/anymore), attach()'s after_idle picks it up
+                self._wake_pending = False
+
+    # Runs api_function(*args) on `pool` (default: the worker pool); on_done gets the result, or the exception as the value.
+    # Nothing is delivered once `token` has been cancelled.
+    def submit(self, pipeline, api_function, *args, on_done=None, lane=PRIORITY_PREFETCH, token=None, pool=None):
+        future = (pool or worker_pool).submit(api_function, *args, lane=lane, token=token)
+        if on_done is not None:
+            def deliver(f):
+                if f.cancelled() or (token is not None and token.cancelled): return
+                self.post(pipeline, on_done, f.exception() or f.result())
+            future.add_done_callback(deliver)
+        return future
+
+    def _run(self, pipeline, handler, result):
+        try:
+            handler(result)
+        except Exception as e:
+            error_handler = self._error_handlers.get(pipeline)
+            if error_handler is None: raise
+            error_handler(e)
+
+    def _drain(self, event=None):
+        with self._lock:
+            self._wake_pending = False
+            pipelines = list(self._queues.items())
+        for pipeline, results in pipelines:
+            while True:
+                try:
+                    handler, result = results.get_nowait()
+                except queue.Empty:
+                    break
+                self._run(pipeline, handler, result)
+
+result_dispatcher = ResultDispatcher()
+
+# --- Bounded Concurrent Translation Engine ---
+INIT_TRANSLATION_CONCURRENCY = 3
+INIT_TRANSLATION_BATCH_SIZE = 4 # words per MyMemory request
+
+# Translates a list of words in batches, a few batches at once, and hands each (word, result) tuple
+# to `on_result` on the worker thread. stop() drops everything not reported yet.
+class ConcurrentTranslationEngine:
+    def __init__(self, max_workers, batch_size, priority=PRIORITY_INIT):
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.priority = priority
+        self._lock = threading.Lock()
+        self._pending = []
+        self._token = CancellationToken()
+
+    # Any earlier start() is stopped first; stop() is the only way to cancel the work.
+    def start(self, words, source_lang, target_lang, on_result):
+        self.stop()
+        token = CancellationToken()
+        with self._lock:
+            self._token = token
+            self._pending = [words[i:i + self.batch_size] for i in range(0, len(words), self.batch_size)][::-1]
+            num_workers = min(self.max_workers, len(self._pending))
+        context = tracer.context() # the session's tags, for the spans opened on worker_pool threads
+        for _ in range(num_workers):
+            worker_pool.submit(self._worker, token, source_lang, target_lang, on_result, context, lane=self.priority, token=token)
+
+    def _worker(self, token, source_lang, target_lang, on_result, context):
+        while not token.cancelled:
+            with self._lock:
+                if token is not self._token or not self._pending: return
+                words = self._pending.pop()
+            with tracer.span("translate.engine_batch", **context):
+                results = translate_many(words, source_lang, target_lang, priority=self.priority)
+            if token.cancelled: return
+            for word in words:
+                on_result((word, results.get(word.strip())))
+
+    def stop(self):
+        with self._lock:
+            self._token.cancel()
+            self._pending = []
+
+
+# --- English Word Pool (distractor sources) ---
+WORD_POOL_BATCH_SIZE = 60
+WORD_POOL_LOW_WATER_MARK = 20
+
+class EnglishWordPool:
+    def __init__(self, batch_size, low_water_mark):
+        self.batch_size = batch_size
+        self.low_water_mark = low_water_mark
+        self._lock = threading.Lock()
+        self._words = [] # lower-case, already filtered; taken from the end
+        self._seen = set() # everything ever pooled or excluded, so nothing is handed out twice
+        self._excluded = set() # quiz words, never usable as distractors
+        self._refilling = False
+        self.fetches = 0
+
+    # Words already used as quiz words. They may still sit in the pool, take() skips them.
+    def exclude(self, words):
+        with self._lock:
+            for word in words:
+                self._excluded.add(word.lower())
+                self._seen.add(word.lower())
+
+    def add_words(self, words):
+        fresh = []
+        with self._lock:
+            for word in words or []:
+                word = word.lower()
+                if 3 <= len(word) <= 10 and word.isalpha() and word not in self._seen:
+                    self._seen.add(word)
+                    fresh.append(word)
+            random.shuffle(fresh)
+            self._words.extend(fresh)
+        return len(fresh)
+
+    def refill(self, priority=PRIORITY_PREFETCH):
+        if DATA_SOURCE_MODE != "offline":
+            self.fetches += 1
+            try:
+                return self.add_words(fetch_random_english_words(self.batch_size, priority))
+            except Exception as e:
+                print(f"Word pool refill failed: {e}")
+        if bundled_lexicon is None or DATA_SOURCE_MODE == "online": return 0
+        return self.add_words([entry[0] for entry in bundled_lexicon.random_entries(self.batch_size)])
+
+    def _refill_in_background(self):
+        try:
+            self.refill()
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def _maybe_refill_locked(self):
+        if len(self._words) < self.low_water_mark and not self._refilling:
+            self._refilling = True
+            worker_pool.submit(self._refill_in_background, lane=PRIORITY_PREFETCH)
+
+    def warm_up(self):
+        with self._lock:
+            self._maybe_refill_locked()
+
+    # Hands out up to `count` distinct words (capitalized), refilling synchronously only if the pool ran dry.
+    def take(self, count, exclude=(), priority=PRIORITY_PREFETCH):
+        exclude = {word.lower() for word in exclude}
+        picked = []
+        for attempt in range(2):
+            with self._lock:
+                while self._words and len(picked) < count:
+                    word = self._words.pop()
+                    if word not in self._excluded and word not in exclude:
+                        picked.append(word.capitalize())
+                self._maybe_refill_locked()
+            if len(picked) >= count or attempt == 1: break
+            self.refill(priority)
+        return picked
+
+    def __len__(self):
+        with self._lock:
+            return len(self._words)
+
+english_word_pool = EnglishWordPool(WORD_POOL_BATCH_SIZE, WORD_POOL_LOW_WATER_MARK)
+
+# The pool only matters when distractors come from the network.
+def warm_up_distractor_sources():
+    if distractor_index is None: english_word_pool.warm_up()
+
+# --- Distractor Index (nearest neighbours over the bundled lexicon) ---
+# NumPy is optional and only imported when the index is first built; without it the pure-Python ranking is used.
+np = None
+_numpy_import_tried = False
+
+def load_numpy():
+    global np, _numpy_import_tried
+    if _numpy_import_tried: return np
+    _numpy_import_tried = True
+    started_at = time.perf_counter()
     try:
-        callback_id, data = api_result_queue.get_nowait()
+        import numpy as np
+    except ImportError:
+        return None
+    startup_profile.record_import("numpy", time.perf_counter() - started_at)
+    return np
+
+DISTRACTOR_SOURCE = os.environ.get("VIBLINGO_DISTRACTORS", "local") # "local" (lexicon index) or "network" (random words)
+DISTRACTOR_NGRAM_DIM = 256
+DISTRACTOR_POS_WEIGHT = 0.5 # bonus for the same part of speech
+DISTRACTOR_LENGTH_WEIGHT = 0.05 # penalty per character of length difference
+DISTRACTOR_CANDIDATES = 6 # nearest glosses kept per word; the question draws its distractors from them
+DISTRACTOR_MEMO_SIZE = 4096
+DISTRACTOR_POS_VALUES = ["noun", "verb", "adj"]
+POS_SUFFIXES = {
+    "en": [("ing", "verb"), ("ize", "verb"), ("ise", "verb"), ("ify", "verb"), ("ous", "adj"), ("ful", "adj"),
+           ("ive", "adj"), ("able", "adj"), ("ible", "adj"), ("less", "adj"), ("al", "adj"), ("ic", "adj")],
+    "de": [("ieren", "verb"), ("eln", "verb"), ("ern", "verb"), ("lich", "adj"), ("isch", "adj"), ("ig", "adj"),
+           ("bar", "adj"), ("sam", "adj")],
+}
+
+# Character trigrams of "^word$" hashed into `dim` buckets (crc32, so stable between runs), L2-normalised.
+def char_ngram_vector(word, dim=DISTRACTOR_NGRAM_DIM):
+    padded = f"^{word.casefold()}$"
+    vector = {}
+    for i in range(len(padded) - 2):
+        bucket = zlib.crc32(padded[i:i + 3].encode("utf-8")) % dim
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+    norm = sum(v * v for v in vector.values()) ** 0.5 or 1.0
+    return {bucket: v / norm for bucket, v in vector.items()}
+
+def guess_part_of_speech(word, lang):
+    entry = distractor_lexicon.find(word, lang) if distractor_lexicon else None
+    if entry: return entry[3]
+    for suffix, pos in POS_SUFFIXES.get(lang, []):
+        if word.casefold().endswith(suffix): return pos
+    return "noun"
+
+# Scores every lexicon entry against a query word by n-gram cosine similarity, part-of-speech match and
+# length difference, and keeps the Thai glosses of the best ones. With NumPy a whole batch of words is one
+# matrix product; without it the same scores are computed entry by entry.
+class DistractorIndex:
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+        self.backend = None # "numpy" or "python", decided when the index is built
+        self._lock = threading.Lock()
+        self._built = False
+        self._memo = OrderedDict() # (lang, lower-case word) -> candidate glosses
+
+    def _build_locked(self):
+        if self._built: return
+        self.backend = "numpy" if load_numpy() is not None else "python"
+        entries = [self.lexicon.entry(i) for i in range(self.lexicon.count)]
+        self._thai = [entry[2] for entry in entries]
+        self._pos = [DISTRACTOR_POS_VALUES.index(entry[3]) if entry[3] in DISTRACTOR_POS_VALUES else 0 for entry in entries]
+        self._keys, self._lengths, self._vectors = {}, {}, {}
+        for lang, column in (("en", 0), ("de", 1)):
+            words = [entry[column].casefold() for entry in entries]
+            self._keys[lang] = {word: i for i, word in enumerate(words)}
+            self._lengths[lang] = [len(word) for word in words]
+            self._vectors[lang] = [char_ngram_vector(word) for word in words]
+        if np is not None:
+            self._matrices = {lang: self._dense(vectors) for lang, vectors in self._vectors.items()}
+            self._pos_onehot = np.eye(len(DISTRACTOR_POS_VALUES), dtype=np.float32)[self._pos]
+            self._length_arrays = {lang: np.array(lengths, dtype=np.float32) for lang, lengths in self._lengths.items()}
+        self._built = True
+
+    @staticmethod
+    def _dense(vectors):
+        matrix = np.zeros((len(vectors), DISTRACTOR_NGRAM_DIM), dtype=np.float32)
+        for row, vector in enumerate(vectors):
+            for bucket, value in vector.items(): matrix[row, bucket] = value
+        return matrix
+
+    def _rank_numpy(self, words, lang):
+        query = self._dense([char_ngram_vector(word) for word in words])
+        query_pos = np.eye(len(DISTRACTOR_POS_VALUES), dtype=np.float32)[[DISTRACTOR_POS_VALUES.index(guess_part_of_speech(w, lang)) for w in words]]
+        query_lengths = np.array([len(word) for word in words], dtype=np.float32)
+        scores = query @ self._matrices[lang].T
+        scores += DISTRACTOR_POS_WEIGHT * (query_pos @ self._pos_onehot.T)
+        scores -= DISTRACTOR_LENGTH_WEIGHT * np.abs(query_lengths[:, None] - self._length_arrays[lang][None, :])
+        own = [self._keys[lang].get(word.casefold(), -1) for word in words] # never the word itself
+        keep = min(len(self._thai), 2 * DISTRACTOR_CANDIDATES + 1) # extra room for itself and entries sharing a gloss
+        top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        ranked = np.take_along_axis(top, order, axis=1).tolist()
+        return [[i for i in row if i != own[r]] for r, row in enumerate(ranked)]
+
+    def _rank_python(self, words, lang):
+        ranked = []
+        for word in words:
+            vector, pos, length = char_ngram_vector(word), guess_part_of_speech(word, lang), len(word)
+            pos_index = DISTRACTOR_POS_VALUES.index(pos)
+            own = self._keys[lang].get(word.casefold())
+            scores = []
+            for i, other in enumerate(self._vectors[lang]):
+                if i == own: continue
+                score = sum(value * other.get(bucket, 0.0) for bucket, value in vector.items())
+                score += DISTRACTOR_POS_WEIGHT * (self._pos[i] == pos_index)
+                score -= DISTRACTOR_LENGTH_WEIGHT * abs(length - self._lengths[lang][i])
+                scores.append((score, i))
+            ranked.append([i for score, i in heapq.nlargest(2 * DISTRACTOR_CANDIDATES, scores)])
+        return ranked
+
+    # Candidate Thai glosses for each word in one batched query; answers are memoised per word.
+    def prime(self, words, lang):
+        if lang not in LEXICON_COLUMNS or lang == "th": return {}
+        with self._lock:
+            self._build_locked()
+            missing = [word for word in dict.fromkeys(words) if (lang, word.casefold()) not in self._memo]
+        if missing:
+            with tracer.span("distractor.query", backend=self.backend, words=len(missing), metric_key=self.backend):
+                ranked = self._rank_numpy(missing, lang) if np is not None else self._rank_python(missing, lang)
+            with self._lock:
+                for word, indices in zip(missing, ranked):
+                    self._memo[(lang, word.casefold())] = list(dict.fromkeys(self._thai[i] for i in indices))[:DISTRACTOR_CANDIDATES]
+                while len(self._memo) > DISTRACTOR_MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        with self._lock:
+            return {word: list(self._memo.get((lang, word.casefold()), [])) for word in words}
+
+    # `count` distinct glosses near `word`, none equal to the correct answer; fewer if the lexicon runs short.
+    def distractors(self, word, lang, correct_translation, count=2):
+        candidates = self.prime([word], lang).get(word, [])
+        correct = (correct_translation or "").casefold()
+        usable = [gloss for gloss in candidates if gloss.casefold() not in correct and correct not in gloss.casefold()] # no near-synonyms of the answer
+        return random.sample(usable, min(count, len(usable)))
+
+distractor_lexicon = bundled_lexicon or (load_bundled_lexicon() if DISTRACTOR_SOURCE == "local" else None)
+distractor_index = DistractorIndex(distractor_lexicon) if DISTRACTOR_SOURCE == "local" and distractor_lexicon else None
+
+# --- Question Record Building (runs on worker threads) ---
+class QuestionPrepError(Exception):
+    pass
+
+def pick_distractor_english_sources(source_word, count=2, priority=PRIORITY_PREFETCH):
+    picked = english_word_pool.take(count, exclude=[source_word], priority=priority)
+    if len(picked) < count:
+        print(f"Not enough English words in the pool for distractors: {picked}")
+    while len(picked) < count:
+        picked.append(f"TempDist{len(picked)+1}")
+    return picked
+
+def is_usable_translation(result):
+    return isinstance(result, str) and result != "RATE_LIMIT"
+
+# Distractors come from distractor_index when there is one (lexicon glosses, no network), otherwise from random
+# English words translated on the fly. Builds a complete current_word_data record for one quiz word.
+# Blocking, never call it from the Tk thread.
+def build_question_word_data(source_word, language_name, priority=PRIORITY_PREFETCH):
+    source_lang = lang_code_map[language_name]
+    use_index = distractor_index is not None and source_lang in LEXICON_COLUMNS # the lexicon only knows en / de
+    if use_index:
+        thai = translation_graph.translate([(source_word, source_lang)], "th", priority)
+        distractor_eng_sources = []
+    else:
+        # Distractors are only ever shown in Thai, so their glosses come straight from their English source words
+        # (no en->xx->th detour); translation_graph batches them with the quiz word wherever a route allows.
+        distractor_eng_sources = pick_distractor_english_sources(source_word, 2, priority)
+        thai = translation_graph.translate([(source_word, source_lang)] + [(word, "en") for word in distractor_eng_sources], "th", priority)
+    correct_thai_translation = thai.get((source_word.strip(), source_lang))
+    if isinstance(correct_thai_translation, Exception): raise correct_thai_translation
+    if correct_thai_translation is None or correct_thai_translation == "RATE_LIMIT":
+        raise QuestionPrepError("Rate limit" if correct_thai_translation == "RATE_LIMIT" else "Error: None")
+
+    if use_index:
+        distractor_final_thai_translations = distractor_index.distractors(source_word, source_lang, correct_thai_translation, 2)
+    else:
+        distractor_final_thai_translations = []
+    for dist_idx, distractor_source in enumerate(distractor_eng_sources):
+        data = thai.get((distractor_source.strip(), "en"))
+        if not is_usable_translation(data):
+            print(f"Error/Rate Limit for final Thai distractor {dist_idx}: {data}")
+            distractor_final_thai_translations.append(f"ตัวเลือกผิดพลาด {dist_idx+1}")
+        elif data.lower() != correct_thai_translation.lower():
+            distractor_final_thai_translations.append(data)
+        else:
+            distractor_final_thai_translations.append(f"สุ่มเลือก {dist_idx+1}")
+    while len(distractor_final_thai_translations) < 2:
+        distractor_final_thai_translations.append(f"ตัวเลือกสำรอง {len(distractor_final_thai_translations)+1}")
+
+    return {
+        "word": source_word,
+        "correct_translation": correct_thai_translation,
+        "distractors": distractor_final_thai_translations[:2]
+    }
+
+# --- Question Prefetch Pipeline ---
+PREFETCH_DEPTH = 2 # how many questions ahead of the one on screen are prepared in the background
+
+class QuestionPrefetcher:
+    def __init__(self, depth, on_ready=None, session_id=None, lane=PRIORITY_PREFETCH):
+        self.depth = depth
+        self.lane = lane # of the questions ahead of the current one
+        self.on_ready = on_ready # called with the slot key, from the worker thread, once a record is built
+        self.session_id = session_id # trace tag
+        self._lock = threading.Lock()
+        self._slots = {} # (language_name, index) -> slot dict
+        self._tokens = {} # language_name -> CancellationToken for that phase's builds
+        self.hits = 0
+        self.misses = 0
+        self.wait_times = deque(maxlen=1000) # seconds each record sat ready before it was shown
+
+    # Makes sure question `index` and the `depth` questions after it are being built.
+    # `current=False` schedules a phase that is not on screen yet, so even question `index` waits behind the current one.
+    def schedule(self, language_name, words, index, current=True):
+        for i in range(index, min(index + self.depth + 1, len(words))):
+            key = (language_name, i)
+            with self._lock:
+                if key in self._slots: continue
+                slot = {"word": None, "record": None, "error": None,
+                        "priority": PRIORITY_CURRENT_QUESTION if current and i == index else self.lane,
+                        "requested_at": time.monotonic(), "ready_at": None,
+                        "done": concurrent.futures.Future()} # resolves once ready; cancelled if the slot is dropped
+                self._slots[key] = slot
+                token = self._tokens.setdefault(language_name, CancellationToken(f"prefetch-{language_name}"))
+            worker_pool.submit(self._build, key, slot, words, lane=slot["priority"], token=token)
+
+    def _build(self, key, slot, words):
+        record, error = None, None
+        try:
+            word = slot["word"] = words[key[1]] # may source the word first (WordStream)
+            with tracer.span("question.build", session=self.session_id, language=key[0], index=key[1], metric_key=key[0]):
+                record = build_question_word_data(word, key[0], priority=lambda: slot["priority"])
+        except Exception as e:
+            error = e
+        with self._lock:
+            if self._slots.get(key) is not slot: return # cleared while we were working
+            slot["record"], slot["error"], slot["ready_at"] = record, error, time.monotonic()
+            slot["done"].set_result(key)
+        if self.on_ready is not None:
+            self.on_ready(key)
+
+    def _pop_ready_locked(self, key):
+        slot = self._slots.get(key)
+        if slot is None or slot["ready_at"] is None: return None
+        del self._slots[key]
+        self.wait_times.append(time.monotonic() - slot["ready_at"])
+        return slot
+
+    # Returns the finished slot for `index` (counted as a hit) or None if it is still being built (a miss).
+    def request(self, language_name, words, index):
+        self.schedule(language_name, words, index)
+        with self._lock:
+            slot = self._pop_ready_locked((language_name, index))
+            if slot is not None: self.hits += 1
+            else:
+                self.misses += 1
+                waiting = self._slots.get((language_name, index))
+                if waiting is not None: waiting["priority"] = PRIORITY_CURRENT_QUESTION # the user is waiting on it now
+            return slot
+
+    def collect(self, language_name, index):
+        with self._lock:
+            return self._pop_ready_locked((language_name, index))
+
+    # Future that resolves once the slot can be collected; already cancelled if nothing is scheduled for it.
+    # Blocking clients call .result(), asyncio clients wrap it with asyncio.wrap_future().
+    def ready_future(self, language_name, index):
+        with self._lock:
+            slot = self._slots.get((language_name, index))
+            if slot is not None: return slot["done"]
+        future = concurrent.futures.Future()
+        future.cancel()
+        return future
+
+    # A record prepared earlier (a session snapshot), ready to be collected.
+    def seed(self, language_name, index, record):
+        done = concurrent.futures.Future()
+        done.set_result((language_name, index))
+        now = time.monotonic()
+        with self._lock:
+            self._slots[(language_name, index)] = {"word": record["word"], "record": record, "error": None, "priority": self.lane,
+                                                   "requested_at": now, "ready_at": now, "done": done}
+
+    # [language, index, record] for every slot that finished without an error.
+    def ready_records(self):
+        with self._lock:
+            return [[key[0], key[1], slot["record"]] for key, slot in sorted(self._slots.items())
+                    if slot["ready_at"] is not None and slot["error"] is None]
+
+    def _drop_locked(self, key):
+        self._slots.pop(key)["done"].cancel()
+
+    # Drops a phase's records and cancels its builds that have not started yet.
+    def cancel_language(self, language_name):
+        with self._lock:
+            token = self._tokens.pop(language_name, None)
+            if token is not None: token.cancel()
+            for key in [key for key in self._slots if key[0] == language_name]:
+                self._drop_locked(key)
+
+    def clear(self):
+        with self._lock:
+            for token in self._tokens.values(): token.cancel()
+            self._tokens.clear()
+            for key in list(self._slots):
+                self._drop_locked(key)
+
+    def metrics(self):
+        with self._lock:
+            ready = sum(1 for slot in self._slots.values() if slot["ready_at"] is not None)
+            waits = list(self.wait_times)
+            return {
+                "queue_depth": ready,
+                "in_flight": len(self._slots) - ready,
+                "hits": self.hits,
+                "misses": self.misses,
+                "avg_wait_ms": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+                "max_wait_ms": round(1000 * max(waits), 1) if waits else 0.0,
+            }
 
-        if INITIALIZATION_STATE == "FETCHING_MASTER_WORDS" and callback_id == "INIT_MASTER_WORDS_RESULT":
-            if isinstance(data, Exception) or data is None:
-                print(f"Error fetching master English words: {data}")
-                INITIALIZATION_STATE = "ERROR"
+# --- Spaced Repetition Review Store (SM-2, snapshot + write-ahead log) ---
+REVIEW_STORE_PATH = os.environ.get("VIBLINGO_REVIEW_PATH", os.path.join(APP_DIR, "viblingo_reviews.jsonl"))
+REVIEW_WAL_COMPACT_EVERY = 500 # WAL records before the snapshot is rewritten
+REVIEW_RELEARN_SECONDS = 10 * 60 # a missed word comes back this soon
+REVIEW_DEFAULT_EASE = 2.5
+REVIEW_MIN_EASE = 1.3
+REVIEW_FAST_ANSWER_SECONDS = 4
+REVIEW_SLOW_ANSWER_SECONDS = 10
+
+# SM-2 answer quality (0-5) from correctness and how long the learner took.
+def review_quality(is_correct, answer_seconds=None):
+    if not is_correct: return 1
+    if answer_seconds is None: return 4
+    if answer_seconds <= REVIEW_FAST_ANSWER_SECONDS: return 5
+    return 4 if answer_seconds <= REVIEW_SLOW_ANSWER_SECONDS else 3
+
+def sm2_update(item, quality, now):
+    if quality < 3:
+        item["reps"] = 0
+        item["lapses"] += 1
+        item["interval"] = 0
+        item["due"] = now + REVIEW_RELEARN_SECONDS
+    else:
+        item["reps"] += 1
+        item["interval"] = 1 if item["reps"] == 1 else 6 if item["reps"] == 2 else round(item["interval"] * item["ease"])
+        item["due"] = now + item["interval"] * 86400
+    item["ease"] = max(REVIEW_MIN_EASE, item["ease"] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    item["last"] = now
+    return item
+
+# Learner items keyed (language, lower-case word). Every change is appended to a write-ahead log next to the
+# snapshot; replaying snapshot + log on load rebuilds the state, and compaction folds the log into the snapshot
+# on a worker thread. A per-language min-heap on due time (stale entries skipped lazily) makes picking the
+# next due words O(k log n).
+class ReviewStore:
+    def __init__(self, path, compact_every=REVIEW_WAL_COMPACT_EVERY):
+        self.path = path
+        self.wal_path = path + ".wal"
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._items = {}
+        self._heaps = {} # language -> heap of (due, lower-case word)
+        self._wal = None
+        self._wal_records = 0
+        self._compacting = False
+        self._loaded = False
+
+    def _ensure_loaded_locked(self):
+        if self._loaded: return
+        self._loaded = True
+        for path in (self.path, self.wal_path + ".compacting", self.wal_path): # a crash mid-compaction leaves the middle one
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            self._put_locked(json.loads(line))
+                        except (ValueError, KeyError, TypeError):
+                            pass # torn last line after a crash
+                        if path == self.wal_path: self._wal_records += 1
+            except OSError:
+                pass
+        try:
+            self._wal = open(self.wal_path, "a", encoding="utf-8")
+        except OSError as e:
+            print(f"Review log disabled ({e}), progress will not be saved")
+
+    def _put_locked(self, item):
+        key = (item["language"], item["word"].lower())
+        self._items[key] = item
+        heap = self._heaps.setdefault(item["language"], [])
+        heapq.heappush(heap, (item["due"], key[1]))
+        if len(heap) > 2 * len(self._items) + 64: # mostly stale entries, rebuild
+            self._heaps[item["language"]] = heap = [(i["due"], k[1]) for k, i in self._items.items() if k[0] == item["language"]]
+            heapq.heapify(heap)
+
+    # Up to `count` words of `language` that are due now, most overdue first.
+    def due_items(self, language, count, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._ensure_loaded_locked()
+            heap = self._heaps.get(language, [])
+            picked, seen = [], set()
+            while heap and len(picked) < count and heap[0][0] <= now:
+                due, word = heapq.heappop(heap)
+                item = self._items.get((language, word))
+                if item is None or item["due"] != due or word in seen: continue
+                seen.add(word)
+                picked.append(dict(item))
+            for item in picked:
+                heapq.heappush(heap, (item["due"], item["word"].lower()))
+            return picked
+
+    # The words (lower-case) among `words` that have been reviewed and are not due again yet.
+    def scheduled_later(self, language, words, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._ensure_loaded_locked()
+            return {word.lower() for word in words if self._items.get((language, word.lower()), {"due": now})["due"] > now}
+
+    def record_review(self, language, word, quality, translation=None, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._ensure_loaded_locked()
+            item = self._items.get((language, word.lower()))
+            item = dict(item) if item else {"language": language, "word": word, "ease": REVIEW_DEFAULT_EASE,
+                                            "interval": 0, "reps": 0, "lapses": 0, "due": now, "last": None}
+            sm2_update(item, quality, now)
+            if is_usable_translation(translation): item["translation"] = translation
+            self._put_locked(item)
+            if self._wal is not None:
+                self._wal.write(json.dumps(item, ensure_ascii=False) + "\n")
+                self._wal.flush()
+                self._wal_records += 1
+                if self._wal_records >= self.compact_every and not self._compacting:
+                    self._compacting = True
+                    worker_pool.submit(self.compact, lane=PRIORITY_PREFETCH)
+            return item
+
+    def compact(self):
+        with self._lock:
+            self._ensure_loaded_locked()
+            if self._wal is None: return
+            items = list(self._items.values())
+            self._wal.close()
+            if os.path.exists(self.wal_path + ".compacting"): # left by a failed compaction, keep its records
+                with open(self.wal_path + ".compacting", "a", encoding="utf-8") as dst, open(self.wal_path, encoding="utf-8") as src:
+                    dst.write(src.read())
+                os.remove(self.wal_path)
             else:
-                init_master_words_temp_raw = data
-                processed_words = list(set(init_master_words_temp_raw))
-                master_initial_english_words = [w.capitalize() for w in processed_words if len(w) >= 3 and len(w) <= 10 and w.isalpha()]
-                random.shuffle(master_initial_english_words)
-
-                num_eng_for_eng_quiz = MAX_QUESTIONS_PER_LANG
-                num_eng_to_attempt_for_german = MAX_QUESTIONS_PER_LANG + 5
-                total_needed_after_filter = num_eng_for_eng_quiz + num_eng_to_attempt_for_german
-
-                if len(master_initial_english_words) < total_needed_after_filter:
-                    print(f"Not enough valid master English words after filtering (need {total_needed_after_filter}, got {len(master_initial_english_words)})")
-                    INITIALIZATION_STATE = "ERROR"
-                else:
-                    english_quiz_source_words.extend(master_initial_english_words[:num_eng_for_eng_quiz])
-                    init_english_words_for_german_candidates = master_initial_english_words[num_eng_for_eng_quiz : total_needed_after_filter]
-                    
-                    INITIALIZATION_STATE = "TRANSLATING_GERMAN_SOURCES"
-                    init_eng_for_german_idx = 0
-                    init_german_sources_collected = []
-                    initial_load_status_label.config(text="2/3: กำลังแปลคำศัพท์เป็นเยอรมัน...")
-                    trigger_next_german_translation_in_init()
-
-        elif INITIALIZATION_STATE == "TRANSLATING_GERMAN_SOURCES" and callback_id == "INIT_GERMAN_TRANSLATION_RESULT":
-            eng_word_processed, german_translation = data 
-
-            if isinstance(german_translation, Exception):
-                print(f"Exception translating '{eng_word_processed}' to German: {german_translation}")
-            elif german_translation == "RATE_LIMIT":
-                print(f"Rate limit hit translating '{eng_word_processed}' to German.")
-                INITIALIZATION_STATE = "ERROR" 
+                os.replace(self.wal_path, self.wal_path + ".compacting") # reviews from now on go to a fresh log
+            self._wal = open(self.wal_path, "a", encoding="utf-8")
+            self._wal_records = 0
+        try:
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                for item in items:
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.path + ".tmp", self.path)
+            os.remove(self.wal_path + ".compacting")
+        except OSError as e:
+            print(f"Review store compaction failed: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded_locked()
+            return len(self._items)
+
+    def close(self):
+        with self._lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+
+review_store = ReviewStore(REVIEW_STORE_PATH)
+
+# --- Quiz Session (headless; the Tk window and the server are both clients of it) ---
+SESSION_ANSWER_HISTORY = 200 # answers a session remembers (the score counts all of them)
+SESSION_POOL_SIZE = 16 # threads for blocking session steps; they may wait on worker_pool tasks, never the other way round
+INIT_RESULT_TIMEOUT_SECONDS = 60
+
+session_pool = WorkerPool(SESSION_POOL_SIZE, "session")
+
+class QuizSessionError(Exception):
+    pass
+
+def is_valid_german_source_word(german_translation):
+    if not german_translation: return False
+    cond_word_count = (len(german_translation.split()) <= 2)
+    cond_min_length = (len(german_translation) >= 2)
+    cond_no_digits = not any(char.isdigit() for char in german_translation)
+    cond_has_some_letters = any(c.lower() in "abcdefghijklmnopqrstuvwxyzäöüß" for c in german_translation.lower())
+    return cond_word_count and cond_min_length and cond_no_digits and cond_has_some_letters
+
+# Same checks for any quiz language; German keeps its own alphabet test.
+def is_valid_source_word(word, lang_code):
+    if lang_code == "de": return is_valid_german_source_word(word)
+    if not word: return False
+    return len(word.split()) <= 2 and len(word) >= 2 and not any(char.isdigit() for char in word) and any(char.isalpha() for char in word)
+
+# The three shuffled answer options for a question record.
+def build_answer_options(word_data):
+    options = [word_data.get("correct_translation", "N/A")] + \
+              [str(d) for d in word_data.get("distractors", ["Dist1 N/A", "Dist2 N/A"])]
+    options = [str(opt) if opt is not None else "ตัวเลือกผิดพลาด" for opt in options]
+    while len(options) < 3: options.append(f"ตัวเลือกสำรอง {len(options)}")
+
+    final_options = options[:3]
+    random.shuffle(final_options)
+    return final_options
+
+# --- Streaming Word Sources (long sessions) ---
+STREAM_SESSION_THRESHOLD = 10 # sessions longer than this source their words lazily
+STREAM_PAGE_SIZE = 20 # random words fetched per request while streaming
+STREAM_WINDOW = 16 # words a stream keeps behind the newest one
+STREAM_TRANSLATION_BATCH = 4
+STREAM_MAX_FAILED_CANDIDATES = 40 # consecutive unusable translations before a stream gives up
+STREAM_MAX_EMPTY_PAGES = 5 # consecutive pages without a new word before a stream gives up (random pages repeat words)
+
+# Sequence view of a word generator for the prefetcher: words[i] pulls the generator up to i (blocking, so only
+# from worker threads) and only a window of recent words is kept. len() is the planned size until the generator
+# runs dry, then the number of words it actually produced.
+class WordStream:
+    def __init__(self, source, size, window=STREAM_WINDOW):
+        self._source = iter(source)
+        self.size = size
+        self.window = window
+        self._lock = threading.Lock() # the window dict and counters only, never held while a word is produced
+        self._producer_lock = threading.Lock() # one thread at a time runs the generator (page fetches, translations)
+        self._words = {} # index -> word, only the last `window`
+        self._produced = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        with self._producer_lock:
+            while True:
+                with self._lock:
+                    if self._produced > index or self._produced >= self.size: break
+                try:
+                    word = next(self._source)
+                except StopIteration:
+                    with self._lock:
+                        self.size = self._produced
+                    break
+                with self._lock:
+                    self._words[self._produced] = word
+                    self._words.pop(self._produced - self.window, None)
+                    self._produced += 1
+        with self._lock:
+            if index not in self._words: raise IndexError(f"word {index} is not available")
+            return self._words[index]
+
+    # Non-blocking; None if the word has not been produced yet (or was already dropped).
+    def peek(self, index):
+        with self._lock:
+            return self._words.get(index)
+
+# Random English quiz words page by page, after `first_words`. Falls back to the lexicon the way the batch init does.
+def stream_english_words(seen, first_words=()):
+    yield from first_words
+    empty_pages = 0
+    while empty_pages < STREAM_MAX_EMPTY_PAGES:
+        page = []
+        if DATA_SOURCE_MODE != "offline":
+            try:
+                page = fetch_random_english_words(STREAM_PAGE_SIZE, PRIORITY_CURRENT_QUESTION) or []
+            except Exception as e:
+                print(f"Streaming word fetch failed: {e}")
+        if not page and DATA_SOURCE_MODE != "online" and bundled_lexicon is not None:
+            page = [entry[0] for entry in bundled_lexicon.random_entries(STREAM_PAGE_SIZE)]
+        fresh = [w.capitalize() for w in dict.fromkeys(page) if 3 <= len(w) <= 10 and w.isalpha() and w.lower() not in seen]
+        empty_pages = 0 if fresh else empty_pages + 1
+        for word in fresh:
+            if word.lower() in seen: continue
+            seen.add(word.lower())
+            english_word_pool.exclude([word])
+            yield word
+    print(f"English word stream gave up after {empty_pages} pages without a new word")
+
+# Quiz words in `lang_code`, after `first_words`: fresh English words translated a small batch at a time and validated.
+def stream_translated_words(lang_code, seen, first_words=()):
+    translated_seen = {word.lower() for word in first_words}
+    yield from first_words
+    candidates = stream_english_words(seen)
+    failures = 0
+    while failures < STREAM_MAX_FAILED_CANDIDATES:
+        batch = list(itertools.islice(candidates, STREAM_TRANSLATION_BATCH))
+        if not batch: return
+        results = translate_many(batch, "en", lang_code, PRIORITY_CURRENT_QUESTION)
+        for eng_word in batch:
+            translated = results.get(eng_word.strip())
+            translated = translated.strip() if is_usable_translation(translated) else None
+            if translated and translated.lower() not in translated_seen and is_valid_source_word(translated, lang_code):
+                failures = 0
+                translated_seen.add(translated.lower())
+                yield translated.capitalize()
             else:
-                is_valid_german_word = False
-                if german_translation:
-                    german_translation = german_translation.strip()
-                    cond_word_count = (len(german_translation.split()) <= 2)
-                    cond_min_length = (len(german_translation) >= 2)
-                    cond_no_digits = not any(char.isdigit() for char in german_translation)
-                    cond_has_some_letters = any(c.lower() in "abcdefghijklmnopqrstuvwxyzäöüß" for c in german_translation.lower())
-
-                    if cond_word_count and cond_min_length and cond_no_digits and cond_has_some_letters:
-                        is_valid_german_word = True
-                
-                if is_valid_german_word:
-                    init_german_sources_collected.append(german_translation.capitalize())
-                    print(f"Successfully translated and validated Eng->De: {eng_word_processed} -> {german_translation.capitalize()}")
-                else:
-                    print(f"Skipping German translation for '{eng_word_processed}'. Result: '{german_translation}'. Failed validation.")
-            
-            init_eng_for_german_idx += 1 
-            
-            if INITIALIZATION_STATE != "ERROR":
-                if len(init_german_sources_collected) >= MAX_QUESTIONS_PER_LANG:
-                    german_quiz_source_words.extend(init_german_sources_collected)
-                    INITIALIZATION_STATE = "DONE"
-                    initial_load_status_label.config(text="3/3: เตรียมข้อมูลเสร็จสิ้น!")
-                    print("--- Initial Word Setup Complete (Threaded) ---") # Debug
-                    # ... (rest of DONE state logic) ...
-                    root.after(500, lambda: initial_load_status_label.destroy())
-                    root.after(500, lambda: review_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=20))
-                    root.after(600, start_next_language_phase)
-                    return 
-                elif init_eng_for_german_idx < len(init_english_words_for_german_candidates):
-                    trigger_next_german_translation_in_init()
-                else: 
-                    print(f"Ran out of English candidates ({len(init_english_words_for_german_candidates)} attempted), but only got {len(init_german_sources_collected)} German words.")
-                    INITIALIZATION_STATE = "ERROR"
-        
-        if INITIALIZATION_STATE == "ERROR":
-            messagebox.showerror("Initialization Error", "เกิดข้อผิดพลาดระหว่างการเตรียมข้อมูลชุดคำศัพท์")
-            initial_load_status_label.config(text="เกิดข้อผิดพลาด!\nโปรแกรมจะปิดในไม่ช้า")
-            root.after(3000, root.quit)
+                failures += 1
+    print(f"Word stream for '{lang_code}' gave up after {failures} unusable translations in a row")
+
+def word_stream_source(language, seen, first_words=()):
+    lang_code = lang_code_map[language]
+    if lang_code == "en": return stream_english_words(seen, first_words)
+    return stream_translated_words(lang_code, seen, first_words)
+
+# --- Language Pipelines ---
+# One per language of a session: its quiz words, the engine that translates its source words and the background
+# preparation of its questions. Every pipeline starts preparing its first questions as soon as the session is
+# initialized, so a phase is ready before the one on screen ends. They all draw on the same worker_pool lanes
+# and api_scheduler quotas, so another language adds work to the shared budget but no serial wait.
+class LanguagePipeline:
+    def __init__(self, language, prefetcher, priority=PRIORITY_INIT):
+        self.language = language
+        self.lang_code = lang_code_map[language]
+        self.prefetcher = prefetcher
+        self.translation_engine = ConcurrentTranslationEngine(INIT_TRANSLATION_CONCURRENCY, INIT_TRANSLATION_BATCH_SIZE, priority)
+        self.words = [] # a WordStream in streaming sessions
+        self.candidates = [] # English words being translated into this language
+        self.ready = concurrent.futures.Future() # resolves once `words` is final; fails with the error if initialization does
+
+    # Ahead of its phase: the first questions, at prefetch priority unless this phase comes first.
+    def warm_up(self, current=False):
+        self.prefetcher.schedule(self.language, self.words, 0, current=current)
+
+    def stop(self):
+        self.translation_engine.stop()
+        self.prefetcher.cancel_language(self.language)
+
+# All state of one learner's run through LANGUAGES_SEQUENCE. Blocking methods (initialize, next_question)
+# must run off the Tk thread / event loop, e.g. on session_pool. The cache, word pool, scheduler and HTTP
+# client are shared by every session in the process. With a review store, due words are asked first and
+# every answer is recorded there. Streaming sessions (long ones by default) pull their words from generators
+# as questions are prepared instead of fetching them all up front. Background sessions (the next launch's
+# snapshot) run every request behind the ones of the session being played.
+class QuizSession:
+    _ids = itertools.count(1)
+
+    def __init__(self, languages=None, questions_per_lang=MAX_QUESTIONS_PER_LANG, prefetch_depth=PREFETCH_DEPTH, on_record_ready=None,
+                 review_store=None, streaming=None, background=False, exclude_words=None):
+        self.session_id = next(QuizSession._ids)
+        self.review_store = review_store
+        self.languages = list(languages or LANGUAGES_SEQUENCE)
+        unknown = [language for language in self.languages if language not in lang_code_map]
+        if unknown: raise QuizSessionError(f"Unknown quiz languages: {unknown}")
+        self.questions_per_lang = questions_per_lang
+        self.streaming = questions_per_lang > STREAM_SESSION_THRESHOLD if streaming is None else streaming
+        # on_record_ready(session, key) is called from a worker thread whenever a prefetched record is built
+        self.init_priority = PRIORITY_BACKGROUND if background else PRIORITY_INIT
+        self.prefetcher = QuestionPrefetcher(prefetch_depth, session_id=self.session_id, lane=PRIORITY_BACKGROUND if background else PRIORITY_PREFETCH,
+                                             on_ready=(lambda key: on_record_ready(self, key)) if on_record_ready else None)
+        self.pipelines = {language: LanguagePipeline(language, self.prefetcher, self.init_priority) for language in self.languages}
+        self.snapshot_saved = False
+        # language -> lower-case words another session is already asking (the live one, for a snapshot session)
+        self.exclude_words = {language: {word.lower() for word in words} for language, words in (exclude_words or {}).items()}
+        self._init_state, self._init_entered_at = "IDLE", time.monotonic()
+        self._prepare_state, self._prepare_entered_at = "IDLE", time.monotonic()
+        self.master_words = []
+        self.language_phase_index = 0
+        self.language_name = ""
+        self.question_index = 0
+        self.current_word_data = {}
+        self.shown_at = None
+        self.answers = deque(maxlen=SESSION_ANSWER_HISTORY) # the most recent answered questions
+        self.answered = 0
+        self.correct = 0
+
+    @property
+    def words_by_language(self):
+        return {language: pipeline.words for language, pipeline in self.pipelines.items()}
+
+    # Every state change closes a trace span for the state being left ("init.state" / "prepare.state").
+    @property
+    def init_state(self):
+        return self._init_state
+
+    @init_state.setter
+    def init_state(self, state):
+        self._init_entered_at = tracer.transition("init", self.session_id, self._init_state, state, self._init_entered_at)
+        self._init_state = state
+
+    @property
+    def prepare_state(self):
+        return self._prepare_state
+
+    @prepare_state.setter
+    def prepare_state(self, state):
+        self._prepare_entered_at = tracer.transition("prepare", self.session_id, self._prepare_state, state, self._prepare_entered_at)
+        self._prepare_state = state
+
+    # Picks the quiz words for every language. Blocking; `progress` gets the status lines the GUI shows.
+    # Each language's pipeline starts (pipeline.ready) as soon as its own words are in, so the first phase can be
+    # played while the others are still being translated.
+    def initialize(self, progress=None):
+        with tracer.span("session.initialize", session=self.session_id, source=DATA_SOURCE_MODE) as span:
+            try:
+                self._initialize(progress)
+            except Exception as e:
+                for pipeline in self.pipelines.values():
+                    if not pipeline.ready.done(): pipeline.ready.set_exception(e if isinstance(e, QuizSessionError) else QuizSessionError(str(e)))
+                raise
+            span.tag(words={language: len(words) for language, words in self.words_by_language.items()})
+
+    def _initialize(self, progress):
+        report = progress or (lambda text: None)
+        report("1/3: ดึงคำศัพท์อังกฤษตั้งต้น...")
+        self.take_due_review_words()
+        if self.streaming:
+            self.start_word_streams()
+        elif DATA_SOURCE_MODE == "offline":
+            if not self.fill_words_from_lexicon():
+                self.init_state = "ERROR"
+                raise QuizSessionError("Not enough words in the offline lexicon")
+        else:
+            try:
+                self._initialize_from_network(report)
+            except QuizSessionError as e:
+                for pipeline in self.pipelines.values(): pipeline.translation_engine.stop()
+                print(e)
+                if not (DATA_SOURCE_MODE == "fallback" and self.fill_words_from_lexicon()):
+                    self.init_state = "ERROR"
+                    raise
+                print("Network initialization failed, continuing with words from the offline lexicon")
+        self.start_pipelines()
+        self.init_state = "DONE"
+        report("3/3: เตรียมข้อมูลเสร็จสิ้น!")
+
+    # Once a language's words are final: its first questions start preparing, long before its phase comes up.
+    def start_pipeline(self, pipeline):
+        if pipeline.ready.done(): return
+        if distractor_index is not None and not self.streaming: # one batched query, so question builds only read the memo
+            distractor_index.prime(pipeline.words, pipeline.lang_code)
+        pipeline.warm_up(current=pipeline.language == self.languages[0] and self.prefetcher.lane == PRIORITY_PREFETCH)
+        pipeline.ready.set_result(pipeline.language)
+
+    def start_pipelines(self):
+        for pipeline in self.pipelines.values():
+            self.start_pipeline(pipeline)
+
+    # Words and the records already prepared for them.
+    def snapshot_state(self):
+        return {"created_at": time.time(), "languages": self.languages, "questions_per_lang": self.questions_per_lang,
+                "words": {language: list(pipeline.words) for language, pipeline in self.pipelines.items()},
+                "records": self.prefetcher.ready_records()}
+
+    # Cold start: question 0 straight from the bundled lexicon, shown while initialize() fetches the rest.
+    # Returns its record, or None if the lexicon has nothing for the first language or is not a word source (online mode).
+    def prepare_local_first_question(self):
+        language = self.languages[0]
+        lang_code = lang_code_map[language]
+        column = LEXICON_COLUMNS.get(lang_code)
+        if bundled_lexicon is None or column is None or lang_code == "th": return None
+        entries = bundled_lexicon.random_entries(3)
+        if not entries: return None
+        word, thai = entries[0][column].capitalize(), entries[0][LEXICON_COLUMNS["th"]]
+        # other entries' glosses: the distractor index (and numpy) is built by initialize(), off the Tk thread
+        distractors = [entry[LEXICON_COLUMNS["th"]] for entry in entries[1:] if entry[LEXICON_COLUMNS["th"]] != thai]
+        while len(distractors) < 2:
+            distractors.append(f"ตัวเลือกสำรอง {len(distractors)+1}")
+        record = {"word": word, "correct_translation": thai, "distractors": distractors[:2]}
+        self.pipelines[language].words = [word]
+        self.prefetcher.seed(language, 0, record)
+        translation_graph.learn(word, lang_code, "th", thai)
+        return record
+
+    # Warm restart: takes the words and prepared records of a snapshot instead of initialize().
+    def restore(self, state):
+        if self.streaming or state["languages"] != self.languages or state["questions_per_lang"] != self.questions_per_lang:
+            raise QuizSessionError("Session snapshot was made for other quiz settings")
+        words = {language: [str(word) for word in state["words"][language]] for language in self.languages}
+        if self.review_store is not None: # reviewed by the session the snapshot was built alongside
+            for language in self.languages:
+                reviewed = self.review_store.scheduled_later(language, words[language])
+                if not reviewed: continue
+                kept = [word for word in words[language] if word.lower() not in reviewed]
+                words[language] = kept + replacement_words(language, len(words[language]) - len(kept), kept + words[language])
+                print(f"Session snapshot: replaced {len(reviewed)} {language} words reviewed since it was made")
+        if any(len(language_words) < self.questions_per_lang for language_words in words.values()):
+            raise QuizSessionError("Session snapshot is missing words")
+        records = [(language, words[language].index(record["word"]), record) for language, index, record in state["records"]
+                   if language in words and record.get("word") in words[language]
+                   and record.get("correct_translation") and len(record.get("distractors", [])) == 2]
+        for language, pipeline in self.pipelines.items():
+            pipeline.words = words[language]
+        for language, index, record in records:
+            self.prefetcher.seed(language, index, record)
+            translation_graph.learn(record["word"], lang_code_map[language], "th", record["correct_translation"])
+        english_word_pool.exclude(words.get("English", []))
+        warm_up_distractor_sources()
+        self.start_pipelines()
+        self.init_state = "DONE"
+        return len(records)
+
+    # Due review words go first; their remembered answers make the translation a free cached route.
+    def take_due_review_words(self):
+        if self.review_store is None: return
+        for language in self.languages:
+            pipeline = self.pipelines[language]
+            excluded = self.exclude_words.get(language, set())
+            due = [item for item in self.review_store.due_items(language, self.questions_per_lang - len(pipeline.words) + len(excluded))
+                   if item["word"] not in pipeline.words and item["word"].lower() not in excluded][:self.questions_per_lang - len(pipeline.words)]
+            pipeline.words.extend(item["word"] for item in due)
+            for item in due:
+                if item.get("translation"):
+                    translation_graph.learn(item["word"], lang_code_map[language], "th", item["translation"])
+        english_word_pool.exclude(self.words_by_language.get("English", []))
+        print(f"Due review words: { {language: len(words) for language, words in self.words_by_language.items()} }")
+
+    # Due words first, then each language's generator; nothing is fetched until the prefetcher asks for a word.
+    def start_word_streams(self):
+        for pipeline in self.pipelines.values(): # each stream has its own seen set, so one language cannot use up another's source
+            seen = {word.lower() for word in pipeline.words}
+            pipeline.words = WordStream(word_stream_source(pipeline.language, seen, pipeline.words), self.questions_per_lang)
+        warm_up_distractor_sources()
+
+    # Fetches random English words for whatever the due words did not cover: the English phase's own words plus
+    # candidates that every other language's pipeline translates at the same time.
+    def _initialize_from_network(self, report):
+        english = self.pipelines.get("English")
+        translated = [pipeline for pipeline in self.pipelines.values() if pipeline.lang_code != "en"]
+        num_eng_for_eng_quiz = max(0, self.questions_per_lang - len(english.words)) if english else 0
+        num_needed = {pipeline.language: max(0, self.questions_per_lang - len(pipeline.words)) for pipeline in translated}
+        if num_eng_for_eng_quiz == 0 and not any(num_needed.values()):
+            warm_up_distractor_sources()
             return
+        self.init_state = "FETCHING_MASTER_WORDS"
+        num_candidates = {language: needed + 5 if needed else 0 for language, needed in num_needed.items()}
+        total_needed_after_filter = num_eng_for_eng_quiz + sum(num_candidates.values())
+        num_master_words_to_fetch = total_needed_after_filter * 2
 
-    except queue.Empty:
-        pass 
-    except Exception as e:
-        print(f"Unexpected error in process_api_queue_for_init: {e}")
-        INITIALIZATION_STATE = "ERROR"
-        messagebox.showerror("Critical Error", f"เกิดข้อผิดพลาดร้ายแรงในการประมวลผลข้อมูล: {e}")
-        initial_load_status_label.config(text="ข้อผิดพลาดร้ายแรง!")
-        root.after(3000, root.quit)
-        return
-
-    if INITIALIZATION_STATE not in ["DONE", "ERROR"]:
-        root.after(100, process_api_queue_for_init)
-
-def trigger_next_german_translation_in_init():
-    global INITIALIZATION_STATE, init_eng_for_german_idx, init_english_words_for_german_candidates, initial_load_status_label
-
-    if INITIALIZATION_STATE == "TRANSLATING_GERMAN_SOURCES" and \
-       init_eng_for_german_idx < len(init_english_words_for_german_candidates) and \
-       len(init_german_sources_collected) < MAX_QUESTIONS_PER_LANG:
-        
-        eng_word = init_english_words_for_german_candidates[init_eng_for_german_idx]
-        initial_load_status_label.config(text=f"2/3: แปลเป็นเยอรมัน: {eng_word} ({len(init_german_sources_collected)+1}/{MAX_QUESTIONS_PER_LANG})...")
-        
-        def translate_eng_to_de_task(eng_word_to_trans):
-            time.sleep(1.1) 
-            result = translate_text_mymemory_core(eng_word_to_trans, "en", "de")
-            return (eng_word_to_trans, result)
-
-        call_api_in_thread(translate_eng_to_de_task, "INIT_GERMAN_TRANSLATION_RESULT", eng_word)
-
-# --- State Variables for Question Preparation ---
-PREPARE_QUESTION_STATE = "IDLE" 
-pq_source_word_for_quiz = ""
-pq_correct_thai_translation = ""
-pq_distractor_eng_sources = []
-pq_distractor_final_thai_translations = []
-pq_current_dist_idx = 0
-
-# --- Question Preparation Logic (Threaded) ---
-def prepare_and_display_next_question():
-    global PREPARE_QUESTION_STATE, pq_source_word_for_quiz, pq_correct_thai_translation
-    global pq_distractor_eng_sources, pq_distractor_final_thai_translations, pq_current_dist_idx
-    global current_question_index_in_lang, current_session_words_for_lang, lang_code_map, current_language_name
-    global current_word_label, choice_buttons, root
+        try:
+            data = fetch_random_english_words(num_master_words_to_fetch, self.init_priority)
+        except Exception as e:
+            raise QuizSessionError(f"Error fetching master English words: {e}")
+        if data is None:
+            raise QuizSessionError("Error fetching master English words: None")
+
+        processed_words = list(set(data) - self.exclude_words.get("English", set()))
+        self.master_words = [w.capitalize() for w in processed_words if len(w) >= 3 and len(w) <= 10 and w.isalpha()]
+        random.shuffle(self.master_words)
+        if len(self.master_words) < total_needed_after_filter:
+            raise QuizSessionError(f"Not enough valid master English words after filtering (need {total_needed_after_filter}, got {len(self.master_words)})")
+
+        if english: english.words.extend(self.master_words[:num_eng_for_eng_quiz])
+        start = num_eng_for_eng_quiz
+        for pipeline in translated:
+            pipeline.candidates = self.master_words[start:start + num_candidates[pipeline.language]]
+            start += len(pipeline.candidates)
+        english_word_pool.exclude(self.master_words[:total_needed_after_filter])
+        english_word_pool.add_words(self.master_words[total_needed_after_filter:]) # the surplus seeds the distractor pool
+        warm_up_distractor_sources()
+        if english: self.start_pipeline(english) # English is playable while the other languages are translated
+
+        remaining = {pipeline.language: len(pipeline.candidates) for pipeline in translated if pipeline.candidates}
+        if not remaining: return
+        self.init_state = "TRANSLATING_SOURCES"
+        report("2/3: กำลังแปลคำศัพท์ตั้งต้น...")
+        results = queue.Queue()
+        for pipeline in translated:
+            if pipeline.candidates:
+                pipeline.translation_engine.start(pipeline.candidates, "en", pipeline.lang_code,
+                                                  on_result=lambda result, language=pipeline.language: results.put((language,) + result))
+        while remaining:
+            try:
+                language, eng_word_processed, translation = results.get(timeout=INIT_RESULT_TIMEOUT_SECONDS)
+            except queue.Empty:
+                break
+            if language not in remaining: continue # that language already has its words
+            remaining[language] -= 1
+            pipeline = self.pipelines[language]
+            if isinstance(translation, Exception):
+                print(f"Exception translating '{eng_word_processed}' to {language}: {translation}")
+            elif translation == "RATE_LIMIT":
+                print(f"Rate limit still hit after retries translating '{eng_word_processed}' to {language}, skipping it.")
+            elif translation and translation.strip().lower() in {w.lower() for w in pipeline.words} | self.exclude_words.get(language, set()):
+                print(f"Skipping {language} translation for '{eng_word_processed}', '{translation}' is already in this session.")
+            elif is_valid_source_word(translation and translation.strip(), pipeline.lang_code):
+                pipeline.words.append(translation.strip().capitalize())
+                print(f"Successfully translated and validated En->{pipeline.lang_code}: {eng_word_processed} -> {pipeline.words[-1]}")
+            else:
+                print(f"Skipping {language} translation for '{eng_word_processed}'. Result: '{translation}'. Failed validation.")
+            report(f"2/3: แปลเป็น {language}: {eng_word_processed} ({min(len(pipeline.words), self.questions_per_lang)}/{self.questions_per_lang})...")
+            if len(pipeline.words) >= self.questions_per_lang:
+                pipeline.translation_engine.stop() # enough valid words, drop whatever is still in flight
+                del pipeline.words[self.questions_per_lang:]
+                del remaining[language]
+                self.start_pipeline(pipeline)
+            elif remaining[language] == 0:
+                break
+        short = {pipeline.language: len(pipeline.words) for pipeline in translated if len(pipeline.words) < self.questions_per_lang}
+        if short:
+            raise QuizSessionError(f"Ran out of English candidates, but only got these word counts: {short}")
+
+    # Tops up every language's quiz words from the bundled lexicon (only languages it has a column for).
+    def fill_words_from_lexicon(self):
+        if bundled_lexicon is None: return False
+        used_english = {w.lower() for pipeline in self.pipelines.values() for w in pipeline.candidates}
+        used = {pipeline.language: {w.lower() for w in pipeline.words} | self.exclude_words.get(pipeline.language, set())
+                for pipeline in self.pipelines.values()}
+        for entry in bundled_lexicon.random_entries(bundled_lexicon.count):
+            if entry[0].lower() in used_english: continue
+            for pipeline in self.pipelines.values():
+                column = LEXICON_COLUMNS.get(pipeline.lang_code)
+                if column is None or len(pipeline.words) >= self.questions_per_lang or entry[column].lower() in used[pipeline.language]: continue
+                pipeline.words.append(entry[column].capitalize())
+                used[pipeline.language].add(entry[column].lower())
+                used_english.add(entry[0].lower())
+                break
+        english_word_pool.exclude(used_english)
+        warm_up_distractor_sources()
+        return all(len(pipeline.words) >= self.questions_per_lang for pipeline in self.pipelines.values())
+
+    @property
+    def phase_words(self):
+        pipeline = self.pipelines.get(self.language_name)
+        return pipeline.words if pipeline else []
+
+    @property
+    def finished(self):
+        return self.language_phase_index >= len(self.languages)
+
+    # None while a streamed word has not been sourced yet.
+    def current_source_word(self):
+        words = self.phase_words
+        if isinstance(words, WordStream): return words.peek(self.question_index)
+        return words[self.question_index]
+
+    # Enters languages[language_phase_index]. Returns its name, or None once every phase is done.
+    def start_language_phase(self):
+        if self.language_name:
+            self.pipelines[self.language_name].stop() # the previous phase is over
+            if not self.finished and self.languages[self.language_phase_index] == self.language_name and not self.phase_has_more_questions():
+                self.language_phase_index += 1 # its words came up short after its last answer
+        if self.finished:
+            self.language_name = ""
+            return None
+        self.language_name = self.languages[self.language_phase_index]
+        self.question_index = 0
+        self.current_word_data = {}
+        if self.pipelines[self.language_name].ready.done() and len(self.phase_words) < self.questions_per_lang:
+            raise QuizSessionError(f"ชุดคำศัพท์สำหรับ {self.language_name} ไม่พร้อม ({len(self.phase_words)} คำ)")
+        self.prefetcher.schedule(self.language_name, self.phase_words, 0)
+        return self.language_name
+
+    def phase_has_more_questions(self):
+        if not self.pipelines[self.language_name].ready.done(): return self.question_index < self.questions_per_lang # words still coming in
+        return self.question_index < min(self.questions_per_lang, len(self.phase_words))
+
+    # False while initialize() has not delivered the current question's word yet (the phase's pipeline.ready).
+    def next_question_available(self):
+        return self.pipelines[self.language_name].ready.done() or self.question_index < len(self.phase_words)
+
+    # Non-blocking: the prepared slot for the current question, or None while it is still being built.
+    def try_take_prepared_question(self):
+        self.prepare_state = "WAITING_FOR_PREFETCH"
+        return self.prefetcher.request(self.language_name, self.phase_words, self.question_index)
+
+    def collect_prepared_question(self):
+        return self.prefetcher.collect(self.language_name, self.question_index)
+
+    def ready_future(self):
+        return self.prefetcher.ready_future(self.language_name, self.question_index)
+
+    # Puts a prepared slot on screen. Returns the record, or None if the question had to be skipped
+    # (slot["error"] says why).
+    def accept_prepared_question(self, slot):
+        if slot["error"] is None:
+            self.current_word_data = slot["record"]
+            self.shown_at = time.monotonic()
+            self.prepare_state = "IDLE"
+            return self.current_word_data
+        self.prepare_state = "ERROR"
+        self._advance_question()
+        self.prepare_state = "IDLE"
+        return None
 
-    if current_question_index_in_lang >= MAX_QUESTIONS_PER_LANG: return
+    def _advance_question(self):
+        self.question_index += 1
+        self.current_word_data = {}
+        if not self.phase_has_more_questions():
+            self.language_phase_index += 1
 
-    pq_source_word_for_quiz = current_session_words_for_lang[current_question_index_in_lang]
-    lang_code_for_thai_translation = lang_code_map[current_language_name]
+    # Returns None if no question is on screen, else {"correct", "correct_answer", "phase_finished"}.
+    def check_answer(self, selected_option):
+        word_data = self.current_word_data
+        if not word_data or not word_data.get("word") or self.prepare_state != "IDLE":
+            return None
+        correct_answer = word_data.get("correct_translation")
+        is_correct = correct_answer is not None and selected_option == correct_answer
+        if self.review_store is not None:
+            quality = review_quality(is_correct, time.monotonic() - self.shown_at if self.shown_at else None)
+            self.review_store.record_review(self.language_name, word_data["word"], quality, correct_answer)
+        self.answers.append({"language": self.language_name, "word": word_data["word"], "selected": selected_option,
+                             "correct_answer": correct_answer, "correct": is_correct})
+        self.answered += 1
+        self.correct += is_correct
+        self._advance_question()
+        return {"correct": is_correct, "correct_answer": correct_answer, "phase_finished": not self.phase_has_more_questions()}
+
+    def needs_new_phase(self):
+        return not self.language_name or not self.phase_has_more_questions()
+
+    # Blocking convenience for headless clients: the next record to show, or None when the session is over.
+    def next_question(self, timeout=None):
+        if self.current_word_data and self.prepare_state == "IDLE": return self.current_word_data # not answered yet
+        while True:
+            if self.needs_new_phase() and self.start_language_phase() is None: return None
+            if not self.next_question_available():
+                try:
+                    self.pipelines[self.language_name].ready.result(timeout)
+                except QuizSessionError:
+                    pass # the phase plays out its words; start_language_phase reports a language that came up short
+                continue
+            slot = self.try_take_prepared_question()
+            if slot is None:
+                try:
+                    self.ready_future().result(timeout)
+                except concurrent.futures.CancelledError:
+                    raise QuizSessionError("Question preparation was cancelled")
+                slot = self.collect_prepared_question()
+            if self.accept_prepared_question(slot) is not None: return self.current_word_data
+            print(f"Skipping '{slot['word']}': {slot['error']}")
+
+    def score(self):
+        return {"answered": self.answered, "correct": self.correct}
+
+    def close(self):
+        for pipeline in self.pipelines.values(): pipeline.translation_engine.stop()
+        self.prefetcher.clear()
+
+# --- Session Snapshot (warm restart) ---
+SESSION_SNAPSHOT_PATH = os.environ.get("VIBLINGO_SNAPSHOT_PATH", os.path.join(APP_DIR, "viblingo_session.snap"))
+SESSION_SNAPSHOT_MAGIC = b"VBSS"
+SESSION_SNAPSHOT_VERSION = 1
+SESSION_SNAPSHOT_HEADER = struct.Struct("<4sII") # magic, version, compressed payload length
+SESSION_SNAPSHOT_MAX_AGE_SECONDS = 7 * 24 * 3600
+SNAPSHOT_BUILD_TIMEOUT_SECONDS = 300 # per question, for the background build
+
+# Header + zlib-compressed JSON, written atomically. Returns the file size.
+def write_session_snapshot(session, path=SESSION_SNAPSHOT_PATH):
+    payload = zlib.compress(json.dumps(session.snapshot_state(), ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SESSION_SNAPSHOT_HEADER.pack(SESSION_SNAPSHOT_MAGIC, SESSION_SNAPSHOT_VERSION, len(payload)))
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return SESSION_SNAPSHOT_HEADER.size + len(payload)
+
+# Reads and removes the snapshot, so a prepared set is only played once. None if missing, stale or unreadable.
+def take_session_snapshot(path=SESSION_SNAPSHOT_PATH):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.remove(path)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"Session snapshot unreadable ({path}): {e}")
+        return None
+    try:
+        magic, version, length = SESSION_SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != SESSION_SNAPSHOT_MAGIC or version != SESSION_SNAPSHOT_VERSION:
+            raise ValueError(f"not a version {SESSION_SNAPSHOT_VERSION} session snapshot")
+        state = json.loads(zlib.decompress(data[SESSION_SNAPSHOT_HEADER.size:SESSION_SNAPSHOT_HEADER.size + length]))
+    except (struct.error, zlib.error, ValueError) as e:
+        print(f"Ignoring session snapshot {path}: {e}")
+        return None
+    if not isinstance(state, dict) or time.time() - state.get("created_at", 0) > SESSION_SNAPSHOT_MAX_AGE_SECONDS:
+        print(f"Ignoring stale session snapshot {path}")
+        return None
+    return state
+
+# Fresh words for a snapshot's reviewed ones: English from the word pool, other languages from the lexicon when it has them.
+def replacement_words(language, count, exclude):
+    if count <= 0: return []
+    exclude = {word.lower() for word in exclude}
+    if language == "English":
+        return english_word_pool.take(count, exclude=exclude, priority=PRIORITY_CURRENT_QUESTION)
+    column = LEXICON_COLUMNS.get(lang_code_map[language])
+    if distractor_lexicon is None or column is None: return []
+    fresh = []
+    for entry in distractor_lexicon.random_entries(distractor_lexicon.count):
+        if len(fresh) >= count: break
+        if entry[column].lower() not in exclude:
+            fresh.append(entry[column].capitalize())
+            exclude.add(entry[column].lower())
+    return fresh
+
+snapshot_session = None # the session being prepared for the next launch
+snapshot_lock = threading.Lock()
+
+def save_snapshot_session(session):
+    with snapshot_lock:
+        if session.snapshot_saved or session.init_state != "DONE": return
+        session.snapshot_saved = True
+        try:
+            size = write_session_snapshot(session)
+        except OSError as e:
+            print(f"Could not write session snapshot: {e}")
+            return
+    print(f"Session snapshot saved ({size} bytes, {len(session.prefetcher.ready_records())} questions prepared)")
+
+# While this session is played: the next launch's words and question records, prepared at background priority
+# and saved once they are all ready (or at exit with whatever is ready by then).
+def build_next_session_snapshot(live_session):
+    global snapshot_session
+    session = snapshot_session = QuizSession(review_store=review_store, prefetch_depth=MAX_QUESTIONS_PER_LANG, background=True,
+                                             exclude_words=None if live_session.streaming else live_session.words_by_language)
+    if session.streaming: return
+    try:
+        session.initialize()
+    except QuizSessionError as e:
+        print(f"Next session could not be prepared: {e}")
+        return
+    for language, pipeline in session.pipelines.items():
+        for index in range(len(pipeline.words)):
+            try:
+                session.prefetcher.ready_future(language, index).result(SNAPSHOT_BUILD_TIMEOUT_SECONDS)
+            except (concurrent.futures.CancelledError, concurrent.futures.TimeoutError):
+                pass
+    save_snapshot_session(session)
+
+def start_next_session_build(live_session):
+    if snapshot_session is None:
+        session_pool.submit(build_next_session_snapshot, live_session, lane=PRIORITY_BACKGROUND)
+
+# --- Initialization (GUI client, event-driven) ---
+gui_session = None # the QuizSession behind the Tk window
+gui_waiting_for_init = False # a local first question was answered before initialize() delivered the next word
 
-    current_word_label.config(text=f"แปล: {pq_source_word_for_quiz} ({current_language_name})...")
-    for btn in choice_buttons: btn.config(state=tk.DISABLED, text="...")
+def start_initialization_process():
+    global gui_session, root, initial_load_status_label, review_frame
+
+    if gui_session is not None:
+        gui_session.close() # anything still running for a previous attempt
+    session = gui_session = new_gui_session()
+    state = take_session_snapshot() if not session.streaming else None
+    if state is not None:
+        review_frame.pack_forget()
+        result_dispatcher.submit("init", restore_session_from_snapshot, session, state,
+                                 on_done=lambda result: on_session_restored(session, result),
+                                 lane=PRIORITY_INIT, pool=session_pool)
+        return
+    start_cold_initialization(session)
+
+def start_cold_initialization(session):
+    watch_language_words(session)
+    if session.prepare_local_first_question() is not None: # something to answer while the rest loads
+        initial_load_status_label.place_forget()
+        review_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
+        start_next_language_phase()
+    else:
+        review_frame.pack_forget() # Hide main quiz UI
+        initial_load_status_label.config(text="1/3: ดึงคำศัพท์อังกฤษตั้งต้น...")
+        initial_load_status_label.place(relx=0.5, rely=0.5, anchor="center") # Show loading label
     root.update_idletasks()
 
-    PREPARE_QUESTION_STATE = "GETTING_CORRECT_TRANS"
-    pq_correct_thai_translation = ""
-    pq_distractor_eng_sources = []
-    pq_distractor_final_thai_translations = []
-    pq_current_dist_idx = 0
-    
-    def task_get_correct_trans(word, src_lang, tgt_lang):
-        time.sleep(0.6)
-        return translate_text_mymemory_core(word, src_lang, tgt_lang)
-    
-    call_api_in_thread(task_get_correct_trans, "PQ_CORRECT_TRANS_RESULT", pq_source_word_for_quiz, lang_code_for_thai_translation, "th")
-    root.after(100, process_api_queue_for_question_prep)
-
-def process_api_queue_for_question_prep():
-    global PREPARE_QUESTION_STATE, root, api_result_queue
-    global pq_source_word_for_quiz, pq_correct_thai_translation
-    global pq_distractor_eng_sources, pq_distractor_final_thai_translations, pq_current_dist_idx
-    global current_language_name, current_word_data, current_question_index_in_lang
-
-    try:
-        callback_id, data = api_result_queue.get_nowait()
-
-        if PREPARE_QUESTION_STATE == "GETTING_CORRECT_TRANS" and callback_id == "PQ_CORRECT_TRANS_RESULT":
-            if isinstance(data, Exception) or data is None or data == "RATE_LIMIT":
-                error_msg = "Rate limit" if data == "RATE_LIMIT" else f"Error: {data}"
-                print(f"{error_msg} translating correct answer for '{pq_source_word_for_quiz}'")
-                messagebox.showwarning("Translation Error", f"ไม่สามารถแปลคำตอบสำหรับ '{pq_source_word_for_quiz}' ({error_msg})\nจะข้ามคำถามนี้")
-                PREPARE_QUESTION_STATE = "ERROR"
-            else:
-                pq_correct_thai_translation = data
-                PREPARE_QUESTION_STATE = "GETTING_DIST_ENG_WORDS"
-                num_dist_eng_needed = 2 * 3 
-                call_api_in_thread(fetch_random_english_words_api_core, "PQ_DIST_ENG_RESULT", num_dist_eng_needed)
-
-        elif PREPARE_QUESTION_STATE == "GETTING_DIST_ENG_WORDS" and callback_id == "PQ_DIST_ENG_RESULT":
-            if isinstance(data, Exception) or data is None or len(data) < 2:
-                print(f"Error/Not enough English words for distractors: {data}")
-                pq_distractor_eng_sources = ["Random", "Word"] 
-            else:
-                temp_pool = list(set(data))
-                random.shuffle(temp_pool)
-                all_primary_eng_sources_used = set(master_initial_english_words[:MAX_QUESTIONS_PER_LANG*2])
-                count = 0
-                for word in temp_pool:
-                    if word.capitalize() not in all_primary_eng_sources_used and \
-                       word.capitalize() not in pq_distractor_eng_sources and \
-                       word.lower() != pq_source_word_for_quiz.lower(): # Check against current quiz word (if English)
-                        pq_distractor_eng_sources.append(word.capitalize())
-                        count += 1
-                    if count >= 2: break
-                while len(pq_distractor_eng_sources) < 2:
-                    pq_distractor_eng_sources.append(f"TempDist{len(pq_distractor_eng_sources)+1}")
-            
-            PREPARE_QUESTION_STATE = "TRANSLATING_DISTRACTORS"
-            pq_current_dist_idx = 0 
-            pq_distractor_final_thai_translations = [] 
-            trigger_next_distractor_translation_pipeline()
+    result_dispatcher.submit("init", session.initialize,
+                             lambda text: result_dispatcher.post("init", lambda text: show_initialization_progress(session, text), text),
+                             on_done=lambda result: on_session_initialized(session, result),
+                             lane=PRIORITY_INIT, pool=session_pool)
+
+def new_gui_session():
+    return QuizSession(review_store=review_store, on_record_ready=lambda session, key: result_dispatcher.post(
+        "question_prep", lambda key: on_prefetched_record_ready(session, key), key))
+
+# Warm restart: the quiz starts straight from the snapshot, without the loading steps. Runs on session_pool,
+# since replacing reviewed words may fetch from the network and the distractor index gets built.
+def restore_session_from_snapshot(session, state):
+    with tracer.span("session.restore", session=session.session_id) as span:
+        records = session.restore(state)
+        span.tag(records=records)
+    return records
+
+def on_session_restored(session, result):
+    global gui_session
+    if session is not gui_session: return
+    if isinstance(result, (QuizSessionError, KeyError, TypeError, ValueError, AttributeError)):
+        print(f"Session snapshot not usable ({result}), initializing from scratch")
+        session.close()
+        gui_session = new_gui_session()
+        start_cold_initialization(gui_session)
+        return
+    if isinstance(result, Exception): raise result # reported by on_init_handler_crash
+    print(f"Warm restart from the session snapshot ({result} questions already prepared)")
+    initial_load_status_label.destroy()
+    review_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
+    start_next_language_phase()
+    start_next_session_build(session)
+
+def show_initialization_progress(session, text):
+    if session is gui_session and session.init_state != "DONE":
+        initial_load_status_label.config(text=text)
+
+def watch_language_words(session):
+    for pipeline in session.pipelines.values():
+        def on_ready(future, language=pipeline.language):
+            if not future.cancelled() and future.exception() is None:
+                result_dispatcher.post("init", lambda language: on_language_words_ready(session, language), language)
+        pipeline.ready.add_done_callback(on_ready)
+
+# A language's words are in (before initialize() has finished the others): start the quiz or resume it.
+def on_language_words_ready(session, language):
+    global gui_waiting_for_init
+    if session is not gui_session: return
+    if not session.language_name and session.language_phase_index == 0 and language == session.languages[0]:
+        initial_load_status_label.place_forget()
+        review_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
+        start_next_language_phase()
+    elif language == session.language_name and gui_waiting_for_init:
+        gui_waiting_for_init = False
+        prepare_and_display_next_question()
 
-        elif PREPARE_QUESTION_STATE == "TRANSLATING_DISTRACTORS" and callback_id.startswith("PQ_DIST_FINAL_THAI_"):
-            dist_idx_processed = int(callback_id.split("_")[-1])
-            
-            if isinstance(data, Exception) or data is None or data == "RATE_LIMIT":
-                print(f"Error/Rate Limit for final Thai distractor {dist_idx_processed}: {data}")
-                pq_distractor_final_thai_translations.append(f"ตัวเลือกผิดพลาด {dist_idx_processed+1}")
-            else:
-                if data.lower() != pq_correct_thai_translation.lower():
-                    pq_distractor_final_thai_translations.append(data)
-                else:
-                    pq_distractor_final_thai_translations.append(f"สุ่มเลือก {dist_idx_processed+1}")
-
-            if len(pq_distractor_final_thai_translations) >= len(pq_distractor_eng_sources):
-                while len(pq_distractor_final_thai_translations) < 2:
-                    pq_distractor_final_thai_translations.append(f"ตัวเลือกสำรอง {len(pq_distractor_final_thai_translations)+1}")
-                PREPARE_QUESTION_STATE = "DONE"
-        
-        if PREPARE_QUESTION_STATE == "DONE":
-            current_word_data = {
-                "word": pq_source_word_for_quiz,
-                "correct_translation": pq_correct_thai_translation,
-                "distractors": pq_distractor_final_thai_translations[:2] 
-            }
-            display_question_on_gui()
-            PREPARE_QUESTION_STATE = "IDLE" 
-            return 
-
-        elif PREPARE_QUESTION_STATE == "ERROR": 
-            current_question_index_in_lang += 1
-            PREPARE_QUESTION_STATE = "IDLE" 
-            if current_question_index_in_lang < MAX_QUESTIONS_PER_LANG:
-                root.after(100, prepare_and_display_next_question)
-            else:
-                current_language_phase_index += 1
-                root.after(100, start_next_language_phase)
+def on_session_initialized(session, result):
+    global gui_waiting_for_init
+    if session is not gui_session:
+        print(f"Ignoring the result of an abandoned initialization (state {session.init_state})")
+        return
+    if isinstance(result, QuizSessionError):
+        if not (session.language_name or session.language_phase_index > 0):
+            show_initialization_error()
             return
+        # already quizzing: the phase on screen plays on, start_language_phase reports a language that came up short
+        print(f"Initialization failed after the quiz started: {result}")
+        if gui_waiting_for_init:
+            gui_waiting_for_init = False
+            prepare_and_display_next_question()
+        return
+    if isinstance(result, Exception): raise result # reported by on_init_handler_crash
+
+    print("--- Initial Word Setup Complete (Threaded) ---") # Debug
+    initial_load_status_label.destroy()
+    if session.language_name or session.language_phase_index > 0: # already quizzing (local first question or the first language's words)
+        if gui_waiting_for_init:
+            gui_waiting_for_init = False
+            prepare_and_display_next_question()
+    else:
+        review_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
+        start_next_language_phase()
+    start_next_session_build(session)
+
+def on_init_handler_crash(e):
+    print(f"Unexpected error while initializing: {e}")
+    gui_session.init_state = "ERROR"
+    gui_session.close()
+    messagebox.showerror("Critical Error", f"เกิดข้อผิดพลาดร้ายแรงในการประมวลผลข้อมูล: {e}")
+    initial_load_status_label.config(text="ข้อผิดพลาดร้ายแรง!")
+    root.after(3000, root.quit)
+
+result_dispatcher.set_error_handler("init", on_init_handler_crash)
+
+def show_initialization_error():
+    review_frame.pack_forget() # the local first question may be on screen
+    initial_load_status_label.place(relx=0.5, rely=0.5, anchor="center")
+    messagebox.showerror("Initialization Error", "เกิดข้อผิดพลาดระหว่างการเตรียมข้อมูลชุดคำศัพท์")
+    initial_load_status_label.config(text="เกิดข้อผิดพลาด!\nโปรแกรมจะปิดในไม่ช้า")
+    root.after(3000, root.quit)
+
+# --- Question Preparation Logic (Prefetched, event-driven) ---
+def prepare_and_display_next_question():
+    global current_word_label, choice_buttons, root, gui_waiting_for_init
 
-    except queue.Empty:
-        pass 
-    except Exception as e:
-        print(f"Unexpected error in process_api_queue_for_question_prep: {e}")
-        PREPARE_QUESTION_STATE = "ERROR" 
-        messagebox.showerror("Question Prep Error", "เกิดข้อผิดพลาดในการเตรียมข้อมูลคำถามปัจจุบัน")
-        current_question_index_in_lang += 1 
-        if current_question_index_in_lang < MAX_QUESTIONS_PER_LANG:
-             root.after(100, prepare_and_display_next_question)
-        else:
-            current_language_phase_index +=1
-            root.after(100, start_next_language_phase)
+    if not gui_session.phase_has_more_questions(): # e.g. its words came up short while a question was waiting for them
+        start_next_language_phase()
+        return
+    if not gui_session.next_question_available(): # on_session_initialized picks this up again
+        gui_waiting_for_init = True
+        current_word_label.config(text="กำลังเตรียมคำถามถัดไป...")
+        for btn in choice_buttons: btn.config(state=tk.DISABLED, text="...")
         return
 
-    if PREPARE_QUESTION_STATE not in ["IDLE", "DONE", "ERROR"]:
-        root.after(100, process_api_queue_for_question_prep)
-
-def trigger_next_distractor_translation_pipeline():
-    global PREPARE_QUESTION_STATE, pq_current_dist_idx, pq_distractor_eng_sources, current_language_name
-
-    if pq_current_dist_idx < len(pq_distractor_eng_sources):
-        eng_dist_src = pq_distractor_eng_sources[pq_current_dist_idx]
-        
-        def task_translate_one_distractor(eng_word_for_dist):
-            time.sleep(0.8) 
-            if current_language_name == "English":
-                return translate_text_mymemory_core(eng_word_for_dist, "en", "th")
-            elif current_language_name == "German":
-                german_intermediate = translate_text_mymemory_core(eng_word_for_dist, "en", "de")
-                if german_intermediate and german_intermediate != "RATE_LIMIT":
-                    time.sleep(0.8)
-                    return translate_text_mymemory_core(german_intermediate, "de", "th")
-                elif german_intermediate == "RATE_LIMIT":
-                    return "RATE_LIMIT"
-                return None
-            return None
+    slot = gui_session.try_take_prepared_question()
+    if slot is not None:
+        finish_question_preparation(slot)
+        return
 
-        call_api_in_thread(task_translate_one_distractor, f"PQ_DIST_FINAL_THAI_{pq_current_dist_idx}", eng_dist_src)
-        pq_current_dist_idx += 1 
-        
-        if pq_current_dist_idx < len(pq_distractor_eng_sources): # If there's another distractor to start processing
-            root.after(50, trigger_next_distractor_translation_pipeline) # Stagger start of next distractor's pipeline
+    current_word_label.config(text=f"แปล: {gui_session.current_source_word() or '...'} ({gui_session.language_name})...")
+    for btn in choice_buttons: btn.config(state=tk.DISABLED, text="...")
+    root.update_idletasks()
+
+# Completion handler for every prefetched record; only the one the screen is waiting for is taken now.
+def on_prefetched_record_ready(session, key):
+    if session is not gui_session or session.prepare_state != "WAITING_FOR_PREFETCH": return
+    if key != (session.language_name, session.question_index): return
+    slot = session.collect_prepared_question()
+    if slot is not None:
+        finish_question_preparation(slot)
+
+def finish_question_preparation(slot):
+    if gui_session.accept_prepared_question(slot) is not None:
+        display_question_on_gui()
+        return
+
+    error = slot["error"]
+    if isinstance(error, QuestionPrepError):
+        print(f"{error} translating correct answer for '{slot['word']}'")
+        messagebox.showwarning("Translation Error", f"ไม่สามารถแปลคำตอบสำหรับ '{slot['word']}' ({error})\nจะข้ามคำถามนี้")
+    else:
+        print(f"Unexpected error while preparing question for '{slot['word']}': {error}")
+        messagebox.showerror("Question Prep Error", "เกิดข้อผิดพลาดในการเตรียมข้อมูลคำถามปัจจุบัน")
+    if gui_session.phase_has_more_questions():
+        root.after(100, prepare_and_display_next_question)
+    else:
+        root.after(100, start_next_language_phase)
 
 # --- GUI Utility Functions ---
 def setup_review_screen_widgets():
@@ -433,95 +2734,124 @@ def setup_review_screen_widgets():
     status_label.pack()
 
 def display_question_on_gui():
-    global current_word_label, choice_buttons, status_label, feedback_label, current_word_data
+    global current_word_label, choice_buttons, status_label, feedback_label
 
+    current_word_data = gui_session.current_word_data
     if not current_word_data or not current_word_data.get("word"):
         current_word_label.config(text="Error: ไม่มีข้อมูลคำถาม")
         for btn in choice_buttons: btn.config(state=tk.DISABLED, text="Error")
         return
 
     current_word_label.config(text=current_word_data.get("word", "N/A"))
-    status_label.config(text=f"{current_language_name} - คำที่ {current_question_index_in_lang + 1}/{MAX_QUESTIONS_PER_LANG}")
+    status_label.config(text=f"{gui_session.language_name} - คำที่ {gui_session.question_index + 1}/{gui_session.questions_per_lang}")
     feedback_label.config(text="")
 
-    options = [current_word_data.get("correct_translation", "N/A")] + \
-              [str(d) for d in current_word_data.get("distractors", ["Dist1 N/A", "Dist2 N/A"])]
-    options = [str(opt) if opt is not None else "ตัวเลือกผิดพลาด" for opt in options]
-    while len(options) < 3: options.append(f"ตัวเลือกสำรอง {len(options)}")
-    
-    final_options = options[:3]
-    random.shuffle(final_options)
-
+    final_options = build_answer_options(current_word_data)
     for i in range(3):
         if i < len(choice_buttons) and i < len(final_options):
             choice_buttons[i].config(text=final_options[i], state=tk.NORMAL, command=lambda opt=final_options[i]: check_answer_action(opt))
         elif i < len(choice_buttons):
              choice_buttons[i].config(text=" - ", state=tk.DISABLED)
+    if "first_question" not in startup_profile.marks: note_first_question_shown()
+
+def note_first_question_shown():
+    root.update_idletasks() # count it once it is drawn
+    startup_profile.mark("first_question")
+    report = startup_profile.report()
+    print(f"Startup profile: {report['marks_ms']} (deferred imports {report['deferred_imports_ms']})")
+    if report["over_budget"]: print(f"Startup over budget: {report['over_budget']} (budget {report['budget_ms']})")
+    tracer.emit("startup", report["marks_ms"]["first_question"] / 1000.0, report["marks_ms"])
+    if STARTUP_PROFILE_EXIT: root.after(0, root.quit)
 
 # --- Quiz Flow Functions ---
 def start_next_language_phase():
-    global current_language_phase_index, current_language_name, current_question_index_in_lang
-    global current_session_words_for_lang, language_display_label, english_quiz_source_words, german_quiz_source_words
-    global PREPARE_QUESTION_STATE
+    global language_display_label
 
-    if PREPARE_QUESTION_STATE != "IDLE":
-        root.after(200, start_next_language_phase)
+    try:
+        language_name = gui_session.start_language_phase()
+    except QuizSessionError as e:
+        messagebox.showerror("Error", str(e))
+        # root.quit() # Avoid abrupt quit, maybe allow user to see error and then close
+        current_word_label.config(text=f"ผิดพลาด: ไม่มีคำศัพท์สำหรับ {gui_session.language_name}")
+        for btn in choice_buttons: btn.config(state=tk.DISABLED)
         return
 
-    if current_language_phase_index < len(LANGUAGES_SEQUENCE):
-        current_language_name = LANGUAGES_SEQUENCE[current_language_phase_index]
-        language_display_label.config(text=current_language_name)
-        current_question_index_in_lang = 0
-
-        if current_language_name == "English":
-            current_session_words_for_lang = list(english_quiz_source_words)
-        elif current_language_name == "German":
-            current_session_words_for_lang = list(german_quiz_source_words)
-        else: current_session_words_for_lang = []
-        
-        if not current_session_words_for_lang or len(current_session_words_for_lang) < MAX_QUESTIONS_PER_LANG:
-            messagebox.showerror("Error", f"ชุดคำศัพท์สำหรับ {current_language_name} ไม่พร้อม ({len(current_session_words_for_lang)} คำ)")
-            # root.quit() # Avoid abrupt quit, maybe allow user to see error and then close
-            current_word_label.config(text=f"ผิดพลาด: ไม่มีคำศัพท์สำหรับ {current_language_name}")
-            for btn in choice_buttons: btn.config(state=tk.DISABLED)
-            return
-
-        feedback_label.config(text="")
-        prepare_and_display_next_question()
-    else:
+    if language_name is None:
         finish_all_reviews_action()
+        return
+    language_display_label.config(text=language_name)
+    feedback_label.config(text="")
+    prepare_and_display_next_question()
 
 def check_answer_action(selected_option):
-    global current_question_index_in_lang, current_word_data, feedback_label, current_language_phase_index
-    global PREPARE_QUESTION_STATE
+    global feedback_label
 
-    if not current_word_data or not current_word_data.get("word") or PREPARE_QUESTION_STATE != "IDLE":
-        return
+    result = gui_session.check_answer(selected_option) if gui_session is not None else None
+    if result is None: return
 
     for btn in choice_buttons: btn.config(state=tk.DISABLED)
 
-    correct_answer = current_word_data.get("correct_translation")
+    correct_answer = result["correct_answer"]
     if correct_answer is None: feedback_label.config(text="Error: ไม่พบคำตอบ", fg="orange")
-    elif selected_option == correct_answer: feedback_label.config(text="ถูกต้อง!", fg="green")
+    elif result["correct"]: feedback_label.config(text="ถูกต้อง!", fg="green")
     else: feedback_label.config(text=f"ผิด! คำตอบคือ: {correct_answer}", fg="red")
 
-    current_question_index_in_lang += 1
-    current_word_data = {} 
-
     delay_ms = 2000
-    if current_question_index_in_lang < MAX_QUESTIONS_PER_LANG:
+    if not result["phase_finished"]:
         root.after(delay_ms, prepare_and_display_next_question)
     else:
-        current_language_phase_index += 1
         root.after(delay_ms, start_next_language_phase)
 
 def finish_all_reviews_action():
-    messagebox.showinfo("เสร็จสิ้นทั้งหมด", "คุณทบทวนคำศัพท์ครบทุกภาษาแล้ว!")
+    print(f"Question prefetch metrics: {gui_session.prefetcher.metrics()}")
+    print(f"HTTP connection stats: {http_client.stats()}")
+    print(f"Worker pool metrics: {worker_pool.metrics()}")
+    print(f"Translation providers: {translation_router.metrics()}")
+    print(f"Stage latencies (ms): {metrics_registry.summary()}")
+    score = gui_session.score()
+    messagebox.showinfo("เสร็จสิ้นทั้งหมด", f"คุณทบทวนคำศัพท์ครบทุกภาษาแล้ว!\nตอบถูก {score['correct']}/{score['answered']} ข้อ")
     root.quit()
 
+# --- Debug Overlay (live counters; VIBLINGO_DEBUG_OVERLAY=1 or F12) ---
+DEBUG_OVERLAY_ENABLED = os.environ.get("VIBLINGO_DEBUG_OVERLAY") == "1"
+DEBUG_OVERLAY_REFRESH_MS = 500
+debug_overlay_label = None
+debug_overlay_visible = False
+
+def debug_overlay_text():
+    lines = []
+    if gui_session is not None:
+        prefetch = gui_session.prefetcher.metrics()
+        lines.append(f"init={gui_session.init_state}  prepare={gui_session.prepare_state}  prefetch hit/miss={prefetch['hits']}/{prefetch['misses']}")
+    pool = worker_pool.metrics()
+    lines.append(f"cache hit/miss={translation_cache.hits}/{translation_cache.misses}  retries={api_scheduler.retries}  pool active={pool['active']} queued={pool['queue_depth']}")
+    outcomes = [f"{name[len('api.request.'):]}={count}" for name, count in sorted(metrics_registry.counters().items()) if name.startswith("api.request.")]
+    lines.append("api requests: " + ("  ".join(outcomes) or "-"))
+    providers = [f"{name}={health['circuit']}/{health['score']}" for name, health in translation_router.metrics().items()]
+    lines.append(f"providers: {'  '.join(providers) or '-'}  hedges={translation_router.hedges}")
+    for name, stats in metrics_registry.summary().items():
+        if name.startswith(("api.request", "api.throttle_wait", "question.build", "prepare.state:WAITING")):
+            lines.append(f"{name}  n={stats['count']}  p50={stats['p50']}ms  p95={stats['p95']}ms")
+    return "\n".join(lines)
+
+def refresh_debug_overlay():
+    if not debug_overlay_visible: return
+    debug_overlay_label.config(text=debug_overlay_text())
+    root.after(DEBUG_OVERLAY_REFRESH_MS, refresh_debug_overlay)
+
+def toggle_debug_overlay(event=None):
+    global debug_overlay_visible
+    debug_overlay_visible = not debug_overlay_visible
+    if debug_overlay_visible:
+        debug_overlay_label.place(relx=0.01, rely=0.99, anchor="sw")
+        debug_overlay_label.lift()
+        refresh_debug_overlay()
+    else:
+        debug_overlay_label.place_forget()
+
 # --- Main Application Setup Function ---
 def create_main_window_and_start_quiz():
-    global root, language_display_label, review_frame, current_word_label, initial_load_status_label
+    global root, language_display_label, initial_load_status_label
 
     root = tk.Tk()
     root.title("โปรแกรมทบทวนศัพท์ (Threaded v2)")
@@ -532,15 +2862,155 @@ def create_main_window_and_start_quiz():
     language_display_label.place(relx=0.98, rely=0.02, anchor="ne")
 
     initial_load_status_label = tk.Label(root, text="กำลังเตรียมข้อมูล...", font=("Arial", 14), bg=COLOR_BACKGROUND, fg=COLOR_WORD_TEXT)
-    # initial_load_status_label will be placed by start_initialization_process
+    initial_load_status_label.place(relx=0.5, rely=0.5, anchor="center")
+    root.update() # first paint before anything else is set up
+    startup_profile.mark("first_paint")
+    root.after_idle(finish_main_window)
+
+    root.mainloop()
+    gui_session.close()
+    if snapshot_session is not None:
+        save_snapshot_session(snapshot_session) # whatever the background build has prepared so far
+        snapshot_session.close()
+    shutdown_background_services()
+
+def finish_main_window():
+    global debug_overlay_label
 
     setup_review_screen_widgets() # Creates review_frame and its children
 
+    debug_overlay_label = tk.Label(root, text="", font=("Courier", 9), justify=tk.LEFT, anchor="w", bg="#FFFFE0", fg="#333333")
+    root.bind("<F12>", toggle_debug_overlay)
+    if DEBUG_OVERLAY_ENABLED: toggle_debug_overlay()
+
+    result_dispatcher.attach(root) # worker results wake the main loop from here on
     start_initialization_process() # Starts threaded loading
 
-    root.mainloop()
+def shutdown_background_services():
+    session_pool.shutdown()
+    hop_pool.shutdown()
+    worker_pool.shutdown()
+    provider_pool.shutdown()
+    review_store.close()
+    translation_cache.close()
+    http_client.close()
+
+# --- Headless Server Mode (asyncio, one JSON object per line) ---
+SERVER_HOST = os.environ.get("VIBLINGO_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("VIBLINGO_SERVER_PORT", "8765"))
+MAX_SERVER_QUESTIONS_PER_LANG = 5000
+SERVER_COMMANDS = ["start", "next", "answer", "score", "quit"]
+asyncio = None # imported by run_quiz_server; the window never needs it
+
+def question_message(session, record):
+    return {"event": "question", "language": session.language_name, "index": session.question_index,
+            "total": session.questions_per_lang, "word": record["word"], "options": build_answer_options(record)}
+
+# Same steps as QuizSession.next_question, but waits for the prefetcher on the event loop instead of a thread.
+async def next_question_async(session):
+    if session.current_word_data and session.prepare_state == "IDLE": return session.current_word_data # not answered yet
+    while True:
+        if session.needs_new_phase() and session.start_language_phase() is None: return None
+        slot = session.try_take_prepared_question()
+        if slot is None:
+            try:
+                await asyncio.wrap_future(session.ready_future())
+            except asyncio.CancelledError:
+                raise QuizSessionError("Question preparation was cancelled")
+            slot = session.collect_prepared_question()
+        if session.accept_prepared_question(slot) is not None: return session.current_word_data
+        print(f"Skipping '{slot['word']}': {slot['error']}")
+
+async def handle_learner_connection(reader, writer):
+    session = QuizSession()
+    peer = writer.get_extra_info("peername")
+    shown = (None, None) # the record on screen and the message it was sent in, so a repeated next keeps its option order
+
+    async def send(message):
+        writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    try:
+        await send({"event": "hello", "commands": SERVER_COMMANDS})
+        while True:
+            line = await reader.readline()
+            if not line: break
+            try:
+                request = json.loads(line)
+                command = request.get("cmd")
+            except (ValueError, AttributeError):
+                await send({"event": "error", "message": "expected one JSON object per line"})
+                continue
+            try:
+                if command == "start":
+                    if "questions" in request: # a fresh session of the requested length
+                        questions = request["questions"]
+                        if not isinstance(questions, int) or not 1 <= questions <= MAX_SERVER_QUESTIONS_PER_LANG:
+                            await send({"event": "error", "message": f"questions must be 1..{MAX_SERVER_QUESTIONS_PER_LANG}"})
+                            continue
+                        session.close()
+                        session = QuizSession(questions_per_lang=questions)
+                    await asyncio.wrap_future(session_pool.submit(session.initialize, lane=PRIORITY_INIT))
+                    await send({"event": "ready", "words": {language: len(words) for language, words in session.words_by_language.items()}})
+                elif command == "next":
+                    if session.init_state != "DONE":
+                        await send({"event": "error", "message": "send start first"})
+                        continue
+                    record = await next_question_async(session)
+                    if record is None:
+                        await send({"event": "finished", "score": session.score()})
+                        continue
+                    if record is not shown[0]: shown = (record, question_message(session, record))
+                    await send(shown[1])
+                elif command == "answer":
+                    result = session.check_answer(request.get("option"))
+                    await send(dict(result, event="result") if result else {"event": "error", "message": "no question to answer"})
+                elif command == "score":
+                    await send(dict(session.score(), event="score"))
+                elif command == "quit":
+                    break
+                else:
+                    await send({"event": "error", "message": f"unknown command {command!r}", "commands": SERVER_COMMANDS})
+            except QuizSessionError as e:
+                await send({"event": "error", "message": str(e)})
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        print(f"Connection from {peer} dropped: {e}")
+    finally:
+        session.close()
+        writer.close()
+
+async def serve_learners(host, port):
+    server = await asyncio.start_server(handle_learner_connection, host, port)
+    print(f"Viblingo quiz server listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+def run_quiz_server(host=SERVER_HOST, port=SERVER_PORT):
+    global asyncio
+    import asyncio
+    try:
+        asyncio.run(serve_learners(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_background_services()
 
 
+startup_profile.mark("import")
+
 # --- Start the Application ---
 if __name__ == "__main__":
-    create_main_window_and_start_quiz()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Viblingo vocabulary review")
+    parser.add_argument("--server", action="store_true", help="serve quiz sessions over TCP (JSON lines) instead of opening the window")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--profile-startup", action="store_true", help="close once the first question is shown, print the startup profile and exit 1 if over budget")
+    args = parser.parse_args()
+    if args.server:
+        run_quiz_server(args.host, args.port)
+    else:
+        STARTUP_PROFILE_EXIT = args.profile_startup
+        create_main_window_and_start_quiz()
+        if args.profile_startup:
+            print(json.dumps(startup_profile.report(), indent=2))
+            if startup_profile.over_budget(): sys.exit(1)